@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# runs all scrollers headless with generated text files of different sizes
+# and in different geometries and collects their frame time reports as JSON
+
+import sys, os, optparse, re
+import json, platform, random, shutil, subprocess, tempfile
+
+SCROLLERS = {
+    "scoroller": ["scoroller.py"],
+    "ocm-scroller": ["ocm-scroller.py", "--text-start-random="],
+    "ocm-scroller-v2": ["ocm-scroller-v2.py"],
+}
+
+# number of lines (= title/score pairs * 2) of the generated text files
+TEXT_SIZES = { "tiny": 12, "large": 1000, "huge": 10000 }
+
+def write_text_file(filename, lines):
+    # score file style title/score pairs, always the same for a given size
+    rnd = random.Random(lines)
+    f = open(filename, "w")
+    for i in range(lines // 2):
+        f.write("Game %d\n" % (i + 1))
+        f.write("%d.%03d %s\n\n" % (rnd.randint(0, 999), rnd.randint(0, 999),
+                                  "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for j in range(3))))
+    f.close()
+
+def run(options, scroller, text_file, geometry, glyph_cache, report_file):
+    args = [sys.executable, options.basedir + SCROLLERS[scroller][0]] + SCROLLERS[scroller][1:] \
+           + ["--headless", "--frames", str(options.frames), "--geometry", geometry,
+              "--text-file", text_file, "--glyph-cache", glyph_cache, "--bench-json", report_file]
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    try:
+        process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        (out, err) = process.communicate(timeout=options.timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return { "error": "timeout after %d seconds" % options.timeout }
+    if process.returncode != 0:
+        return { "error": "exit code %d: %s" % (process.returncode, err.decode("utf-8", "replace").strip()[-500:]) }
+    f = open(report_file)
+    report = json.load(f)
+    f.close()
+    return report
+
+def compare(results, baseline, tolerance):
+    # returns the list of runs whose p95 frame time got worse than tolerance * baseline
+    old = dict(((r["scroller"], r["size"], r["geometry"]), r) for r in baseline["results"])
+    regressions = []
+    for r in results:
+        b = old.get((r["scroller"], r["size"], r["geometry"]))
+        if not b or "error" in b:
+            continue
+        if "error" in r:
+            regressions.append("%s %s %s: %s" % (r["scroller"], r["size"], r["geometry"], r["error"]))
+        elif r["frame_ms"]["p95"] > b["frame_ms"]["p95"] * tolerance:
+            regressions.append("%s %s %s: p95 %.3f ms (was %.3f ms)" % (r["scroller"], r["size"], r["geometry"],
+                                                                      r["frame_ms"]["p95"], b["frame_ms"]["p95"]))
+    return regressions
+
+def main(options):
+    tempdir = tempfile.mkdtemp(prefix="scroller-bench-")
+    results = []
+    try:
+        for size in options.sizes:
+            text_file = os.path.join(tempdir, "%s.txt" % size)
+            write_text_file(text_file, TEXT_SIZES[size])
+            for geometry in options.geometries:
+                for scroller in options.scrollers:
+                    sys.stderr.write("%s %s %s ...\n" % (scroller, size, geometry))
+                    result = { "scroller": scroller, "size": size, "lines": TEXT_SIZES[size], "geometry": geometry }
+                    glyph_cache = tempfile.mkdtemp(prefix="glyphs-", dir=tempdir) # every run starts cold, not with the user's
+                    result.update(run(options, scroller, text_file, geometry, glyph_cache, os.path.join(tempdir, "report.json")))
+                    results.append(result)
+    finally:
+        shutil.rmtree(tempdir)
+
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": options.frames,
+        "results": results,
+    }
+    output = json.dumps(data, indent=2, sort_keys=True) + "\n"
+    if options.output:
+        f = open(options.output, "w")
+        f.write(output)
+        f.close()
+    else:
+        sys.stdout.write(output)
+
+    if options.compare:
+        f = open(options.compare)
+        regressions = compare(results, json.load(f), options.tolerance)
+        f.close()
+        for regression in regressions:
+            sys.stderr.write("REGRESSION %s\n" % regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    options_error = False
+    parser = optparse.OptionParser()
+    parser.add_option("--scrollers", type="string", default=",".join(sorted(SCROLLERS.keys())), action="store",
+                      dest="scrollers", help="comma separated list of scrollers to run")
+
+    parser.add_option("--sizes", type="string", default="tiny,large,huge", action="store",
+                      dest="sizes", help="comma separated list of text sizes (%s)" % ", ".join(sorted(TEXT_SIZES.keys())))
+
+    parser.add_option("--geometries", type="string", default="320x240,800x600,1920x1080", action="store",
+                      dest="geometries", help="comma separated list of screen sizes in [width]x[height]")
+
+    parser.add_option("--frames", type="int", default=500, action="store",
+                      dest="frames", help="number of frames per run")
+
+    parser.add_option("--timeout", type="int", default=600, action="store",
+                      dest="timeout", help="max. seconds per run")
+
+    parser.add_option("-o", "--output", type="string", default=None, action="store",
+                      dest="output", help="write the JSON report to this file instead of stdout")
+
+    parser.add_option("--compare", type="string", default=None, action="store",
+                      dest="compare", help="JSON report of an earlier run to check for regressions")
+
+    parser.add_option("--tolerance", type="float", default=1.25, action="store",
+                      dest="tolerance", help="max. ratio of p95 frame times against the --compare report")
+
+    (options, args) = parser.parse_args()
+
+    options.scrollers = options.scrollers.split(",")
+    options.sizes = options.sizes.split(",")
+    options.geometries = options.geometries.split(",")
+    if [s for s in options.scrollers if s not in SCROLLERS] \
+       or [s for s in options.sizes if s not in TEXT_SIZES] \
+       or [g for g in options.geometries if not re.search("^(\d+)x(\d+)$", g)]:
+        options_error = True
+
+    options.basedir = os.path.dirname(os.path.abspath(__file__)) + "/"
+
+    if options_error:
+        parser.print_usage()
+    else:
+        main(options)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# replays all scrollers headless with a fixed text, geometry and speed and
+# checks that every way of drawing them still draws the same frames: the
+# hashes of selected frames (see --hash-frames) are compared against the
+# golden ones in replay-golden.json. the frame times of each run are
+# reported next to them, so a faster backend is checked for drawing the
+# same picture in the same go.
+#
+#   ./replay.py                      check all scrollers and backends
+#   ./replay.py --update             record the golden hashes (with the reference backend)
+#   ./replay.py --backends atlas -o report.json
+#
+# the hashes depend on how the font is rasterized, so they have to be
+# recorded again with other versions of pygame/SDL_ttf.
+
+import sys, os, optparse
+import json, platform, shutil, subprocess, tempfile
+
+from benchmark import write_text_file
+
+# the runs replayed: scroller arguments, frames to run and which to hash
+SCENARIOS = {
+    "scoroller": { "args": ["scoroller.py", "--geometry", "320x240", "--speed", "1"],
+                   "frames": 1000, "hash_frames": "50" },
+    "ocm-scroller": { "args": ["ocm-scroller.py", "--text-start-random=", "--geometry", "800x600", "--speed", "3"],
+                      "frames": 1100, "hash_frames": "quarters" },
+    "ocm-scroller-v2": { "args": ["ocm-scroller-v2.py", "--geometry", "800x600", "--speed", "3"],
+                         "frames": 600, "hash_frames": "25" },
+}
+
+# number of lines of the text (see benchmark.write_text_file())
+TEXT_LINES = 40
+
+# the ways of drawing the same frames. the reference takes the plainest path
+# everywhere; the others change one thing about it, for the scrollers it
+# makes a difference for (None: all of them)
+REFERENCE = ["--text-renderer", "ttf", "--prerender-workers", "0", "--no-dirty-rects",
+             "--scene-engine", "blit", "--crawl-engine", "legacy"]
+
+BACKENDS = {
+    "reference": ([], None),
+    "cached": (["--prerender-workers", "2", "--prerender-min-batch", "1", "--render-cache-size", "16"], None),
+    "vectorized": (["--scene-engine", "surfarray", "--crawl-engine", "fast"], ["ocm-scroller", "ocm-scroller-v2"]),
+    "dirty-rect": (["--dirty-rects"], None),
+    "atlas": (["--text-renderer", "atlas"], None),
+}
+
+def run(options, scenario, backend, text_file, glyph_cache, report_file):
+    args = [sys.executable, options.basedir + SCENARIOS[scenario]["args"][0]] + SCENARIOS[scenario]["args"][1:] \
+           + REFERENCE + BACKENDS[backend][0] \
+           + ["--headless", "--frames", str(SCENARIOS[scenario]["frames"]),
+              "--hash-frames", SCENARIOS[scenario]["hash_frames"], "--text-file", text_file,
+              "--glyph-cache", glyph_cache, "--bench-json", report_file]
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    try:
+        process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        (out, err) = process.communicate(timeout=options.timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return { "error": "timeout after %d seconds" % options.timeout }
+    if process.returncode != 0:
+        return { "error": "exit code %d: %s" % (process.returncode, err.decode("utf-8", "replace").strip()[-500:]) }
+    f = open(report_file)
+    report = json.load(f)
+    f.close()
+    return report
+
+def check(result, golden):
+    # the frames whose hashes differ from the golden ones
+    if golden is None:
+        return ["no golden hashes"]
+    hashes = result["frame_hashes"]
+    return ["frame %s" % n for n in sorted(set(golden) | set(hashes), key=int) if golden.get(n) != hashes.get(n)]
+
+def main(options):
+    golden = { "scenarios": {} }
+    if os.path.exists(options.golden):
+        f = open(options.golden)
+        golden = json.load(f)
+        f.close()
+
+    tempdir = tempfile.mkdtemp(prefix="scroller-replay-")
+    results = []
+    failures = []
+    try:
+        text_file = os.path.join(tempdir, "scores.txt")
+        write_text_file(text_file, TEXT_LINES)
+        glyph_cache = os.path.join(tempdir, "glyphs") # built by the first atlas run, loaded by the others
+        for scenario in options.scenarios:
+            backends = [b for b in options.backends if BACKENDS[b][1] is None or scenario in BACKENDS[b][1]]
+            if options.update:
+                backends = ["reference"] + [b for b in backends if b != "reference"]
+            for backend in backends:
+                sys.stderr.write("%s %s ...\n" % (scenario, backend))
+                result = { "scenario": scenario, "backend": backend }
+                result.update(run(options, scenario, backend, text_file, glyph_cache, os.path.join(tempdir, "report.json")))
+                if "error" not in result:
+                    if options.update and backend == "reference":
+                        golden["scenarios"][scenario] = dict(SCENARIOS[scenario], lines=TEXT_LINES,
+                                                             frame_hashes=result["frame_hashes"])
+                    expected = golden["scenarios"].get(scenario)
+                    result["mismatches"] = check(result, expected and expected["frame_hashes"])
+                    if result["mismatches"]:
+                        failures.append("%s %s: %s" % (scenario, backend, ", ".join(result["mismatches"][:10])))
+                else:
+                    failures.append("%s %s: %s" % (scenario, backend, result["error"]))
+                results.append(result)
+    finally:
+        shutil.rmtree(tempdir)
+
+    if options.update:
+        golden["python"] = platform.python_version()
+        golden["pygame"] = pygame_version()
+        f = open(options.golden, "w")
+        f.write(json.dumps(golden, indent=2, sort_keys=True) + "\n")
+        f.close()
+
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": pygame_version(),
+        "results": results,
+    }
+    output = json.dumps(data, indent=2, sort_keys=True) + "\n"
+    if options.output:
+        f = open(options.output, "w")
+        f.write(output)
+        f.close()
+
+    for r in results:
+        if "error" not in r:
+            sys.stderr.write("%-16s %-11s %-8s p50 %7.3f ms  p95 %7.3f ms\n" % (r["scenario"], r["backend"],
+                             "MISMATCH" if r["mismatches"] else "ok", r["frame_ms"]["p50"], r["frame_ms"]["p95"]))
+    if golden.get("pygame") not in (None, pygame_version()):
+        sys.stderr.write("golden hashes are of pygame %s, this is %s\n" % (golden["pygame"], pygame_version()))
+    for failure in failures:
+        sys.stderr.write("FAILED %s\n" % failure)
+    if failures:
+        sys.exit(1)
+
+def pygame_version():
+    # pygame, SDL and SDL_ttf, which draw the pixels
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    return subprocess.check_output([sys.executable, "-c", "import pygame, pygame.font; "
+                                    "print('%s (SDL %d.%d.%d, SDL_ttf %d.%d.%d)' % ((pygame.version.ver,) "
+                                    "+ pygame.get_sdl_version() + pygame.font.get_sdl_ttf_version()))"],
+                                   env=env).decode("ascii").strip()
+
+if __name__ == '__main__':
+    options_error = False
+    parser = optparse.OptionParser()
+    parser.add_option("--scenarios", type="string", default=",".join(sorted(SCENARIOS.keys())), action="store",
+                      dest="scenarios", help="comma separated list of scrollers to replay")
+
+    parser.add_option("--backends", type="string", default=",".join(sorted(BACKENDS.keys())), action="store",
+                      dest="backends", help="comma separated list of backends to check (%s)" % ", ".join(sorted(BACKENDS.keys())))
+
+    parser.add_option("--golden", type="string", default=None, action="store",
+                      dest="golden", help="file of the golden hashes (default: replay-golden.json)")
+
+    parser.add_option("--update", default=False, action="store_true",
+                      dest="update", help="record the golden hashes of the replayed scrollers anew")
+
+    parser.add_option("--timeout", type="int", default=600, action="store",
+                      dest="timeout", help="max. seconds per run")
+
+    parser.add_option("-o", "--output", type="string", default=None, action="store",
+                      dest="output", help="write the JSON report with hashes and frame times to this file")
+
+    (options, args) = parser.parse_args()
+
+    options.scenarios = options.scenarios.split(",")
+    options.backends = options.backends.split(",")
+    if [s for s in options.scenarios if s not in SCENARIOS] \
+       or [b for b in options.backends if b not in BACKENDS]:
+        options_error = True
+
+    options.basedir = os.path.dirname(os.path.abspath(__file__)) + "/"
+    if options.golden is None:
+        options.golden = options.basedir + "replay-golden.json"
+
+    if options_error:
+        parser.print_usage()
+    else:
+        main(options)
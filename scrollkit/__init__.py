@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+# shared building blocks of the scroller scripts
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# fonts and rendered text, shared by all effects of a process.
+#
+# text is rendered on the loader thread (when preparing a new text model) and
+# on the render thread (i.e. lazily built ticker tiles). SDL_ttf fonts must not
+# be used by two threads at once, so all font access goes through one lock.
+# batches of lines can be rendered in parallel by a process pool instead
+# (see scrollkit.prerender), when preparing a text only: the round trip to
+# the pool does not fit into a frame.
+#
+# the font file is read once; every size is created from the data in memory.
+# lines are rendered with the font or composed from glyph atlases (see
+# scrollkit.glyphs).
+
+import collections, io, threading
+import pygame
+
+from scrollkit.glyphs import AtlasCache
+from scrollkit.prerender import Prerenderer
+
+class RenderCache(object):
+    # keeps pre-rendered text surfaces, keyed by (text, font, size, color).
+    # the least recently used entries are dropped once max_size is reached,
+    # so rotating through thousands of lines cannot grow memory without limit
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.surfaces = collections.OrderedDict()
+
+    def get(self, key):
+        return self.surfaces.get(key)
+
+    def add(self, key, surface):
+        if key not in self.surfaces:
+            while len(self.surfaces) >= self.max_size > 0:
+                self.surfaces.popitem(last=False)
+        self.surfaces[key] = surface # (re-)insert as most recently used
+
+    def __contains__(self, key):
+        return key in self.surfaces
+
+    def clear(self):
+        self.surfaces.clear()
+
+class Assets(object):
+    # text metrics (font.size()) are cached separately and survive text
+    # changes: they are cheap to keep and most lines of a new text are the
+    # lines of the old one
+
+    def __init__(self, font_filename, cache_size, metrics_cache_size=0, prerender_workers=0, prerender_min_batch=16,
+                 glyph_cache=None, text_renderer="ttf"):
+        self.font_filename = font_filename
+        self.font_data = None
+        self.fonts = {}
+        self.glyph_cache = glyph_cache
+        self.atlases = None
+        self.text_renderer = text_renderer
+        self.cache = RenderCache(cache_size)
+        self.metrics = collections.OrderedDict()
+        self.metrics_cache_size = metrics_cache_size
+        self.prerenderer = Prerenderer(font_filename, prerender_workers, prerender_min_batch)
+        self.lock = threading.RLock()
+
+    def font_file(self):
+        # the font file's data, as a file of its own for every font using it
+        with self.lock:
+            if self.font_data is None:
+                f = open(self.font_filename, "rb")
+                try:
+                    self.font_data = f.read()
+                finally:
+                    f.close()
+            return io.BytesIO(self.font_data)
+
+    def font(self, size):
+        # the font is created once per size
+        with self.lock:
+            font = self.fonts.get(size)
+            if font is None:
+                font = self.fonts[size] = pygame.font.Font(self.font_file(), size)
+            return font
+
+    def atlas(self, size, color):
+        # the glyph atlas of size and color (see scrollkit.glyphs)
+        with self.lock:
+            if self.atlases is None:
+                self.atlases = AtlasCache(self.font_file().getvalue(), self.glyph_cache)
+            return self.atlases.get(self.font(size), size, color)
+
+    def render(self, text, size, color):
+        with self.lock:
+            key = (text, self.font_filename, size, color)
+            surface = self.cache.get(key)
+            if surface is None:
+                surface = self.compose(text, size, color)
+                if surface is None:
+                    surface = self.font(size).render(text, 1, color)
+            self.cache.add(key, surface)
+            return surface
+
+    def compose(self, text, size, color):
+        # text composed from the glyph atlas, or None if it cannot be
+        if self.text_renderer != "atlas":
+            return None
+        with self.lock:
+            atlas = self.atlas(size, color)
+            missing = set(c for c in text if c not in atlas.cells)
+            if [c for c in missing if not self.atlases.add(self.font(size), size, color, c)]:
+                return None
+            return atlas.compose(text)
+
+    def prerender(self, requests, pool=False):
+        # makes sure the (text, size, color) requests are in the cache, i.e.
+        # before they are drawn on the render thread. with pool (on the
+        # loader thread), large batches are rendered by the process pool,
+        # without holding the lock meanwhile
+        with self.lock:
+            missing = []
+            for (text, size, color) in requests:
+                color = tuple(color)
+                if (text, self.font_filename, size, color) not in self.cache:
+                    missing.append((text, size, color))
+            missing = list(collections.OrderedDict.fromkeys(missing)) # without duplicates
+            if self.text_renderer == "atlas":
+                # composing is cheaper than the round trip to the pool
+                rest = []
+                for (text, size, color) in missing:
+                    surface = self.compose(text, size, color)
+                    if surface is None:
+                        rest.append((text, size, color))
+                    else:
+                        self.cache.add((text, self.font_filename, size, color), surface)
+                missing = rest
+        surfaces = None
+        if pool:
+            surfaces = self.prerenderer.render(missing)
+        with self.lock:
+            if surfaces is None:
+                for (text, size, color) in missing:
+                    self.render(text, size, color)
+            else:
+                for ((text, size, color), surface) in zip(missing, surfaces):
+                    self.cache.add((text, self.font_filename, size, color), surface)
+
+    def size(self, text, size):
+        # the size text will have when rendered, without rendering it
+        key = (text, size)
+        with self.lock:
+            metrics = self.metrics.pop(key, None)
+            if metrics is None:
+                metrics = self.font(size).size(text)
+                while len(self.metrics) >= self.metrics_cache_size > 0:
+                    self.metrics.popitem(last=False)
+            self.metrics[key] = metrics # (re-)insert as most recently used
+            return metrics
+
+    def store_atlases(self):
+        # writes new and grown glyph atlases to the glyph cache. not on the
+        # render thread: it is disk i/o
+        with self.lock:
+            if self.atlases is None:
+                return
+            files = self.atlases.unsaved_files()
+        self.atlases.store(files)
+
+    def clear(self):
+        # forget all rendered text
+        with self.lock:
+            self.cache.clear()
+
+    def close(self):
+        self.store_atlases()
+        self.clear()
+        self.prerenderer.close()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# headless benchmarking of the scrollers.
+#
+# in headless mode the scrollers render into SDL's dummy video driver, run a
+# fixed number of frames without waiting for the frame clock and report how
+# long each frame took. font rasterizations and surface allocations are
+# counted by wrapping the pygame functions that do them.
+#
+# with --hash-frames the report also has md5 hashes of the screen's pixels,
+# of every n-th frame or of the frames at the quarters of each scene, to
+# check that a faster way of drawing still draws the same (see replay.py).
+# hashing is not counted in the frame times.
+
+import hashlib, json, os, sys, time
+
+def hash_schedule(spec):
+    # --hash-frames as a number of frames or "quarters", None if it is neither
+    if spec == "quarters":
+        return spec
+    if spec is not None and spec.isdigit() and int(spec) > 0:
+        return int(spec)
+    return None
+
+def percentile(values, p):
+    # nearest-rank percentile of a sorted list
+    if not values:
+        return None
+    rank = int(round(p / 100.0 * (len(values) - 1)))
+    return values[max(0, min(len(values) - 1, rank))]
+
+class Counters(object):
+    # counts font.render() calls and new surfaces (created directly, by
+    # font rendering, scaling or conversion) process-wide
+
+    def __init__(self):
+        self.rasterizations = 0
+        self.allocations = 0
+        self.installed = False
+
+    def install(self):
+        # wrap the pygame functions, once per process
+        if self.installed:
+            return
+        self.installed = True
+        import pygame
+        counters = self
+
+        class CountingSurface(pygame.Surface):
+            def __init__(self, *args, **kwargs):
+                super(CountingSurface, self).__init__(*args, **kwargs)
+                counters.allocations += 1
+
+        real_font = pygame.font.Font
+
+        class CountingFont(object):
+            def __init__(self, *args, **kwargs):
+                self.font = real_font(*args, **kwargs)
+
+            def render(self, *args, **kwargs):
+                counters.rasterizations += 1
+                counters.allocations += 1
+                return self.font.render(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(self.font, name)
+
+        def counting(function):
+            def wrapper(*args, **kwargs):
+                counters.allocations += 1
+                return function(*args, **kwargs)
+            return wrapper
+
+        pygame.Surface = CountingSurface
+        pygame.font.Font = CountingFont
+        pygame.transform.scale = counting(pygame.transform.scale)
+        pygame.transform.smoothscale = counting(pygame.transform.smoothscale)
+
+# shared by the benchmark and the runtime metrics
+counters = Counters()
+
+class Benchmark(object):
+    # create it before pygame.init(), call frame_done() once per frame and
+    # stop the main loop as soon as it returns False
+
+    def __init__(self, frames, hash_frames=None):
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        self.frames = frames
+        self.hash_frames = hash_schedule(hash_frames)
+        self.counters = counters
+        self.counters.install()
+        self.frame_times = []
+        self.frame_hashes = {} # frame number (counting from 0) -> md5 of the screen
+        self.scene_frame = None # for finding the quarters
+        self.started = time.perf_counter()
+        self.last = None
+
+    def start(self):
+        # call right before the main loop, so setup is not counted as a frame
+        self.last = time.perf_counter()
+
+    def frame_done(self, screen=None, frame=None, frames_max=None):
+        # screen shows frame number frame of a scene of frames_max frames
+        now = time.perf_counter()
+        if self.last is not None:
+            self.frame_times.append(now - self.last)
+        if screen is not None and self.hashed(frame, frames_max):
+            import pygame
+            self.frame_hashes[len(self.frame_times) - 1] = hashlib.md5(pygame.image.tostring(screen, "RGB")).hexdigest()
+            now = time.perf_counter()
+        self.last = now
+        return len(self.frame_times) < self.frames
+
+    def hashed(self, frame, frames_max):
+        # whether to hash the frame drawn last
+        if self.hash_frames == "quarters":
+            # the first frame drawn of each quarter of a scene (endless scenes have none)
+            last = self.scene_frame
+            self.scene_frame = frame
+            if frame is None or not frames_max:
+                return False
+            if last is None or frame <= last:
+                return True # a new scene
+            return last * 4 // frames_max != frame * 4 // frames_max
+        if self.hash_frames:
+            return (len(self.frame_times) - 1) % self.hash_frames == 0
+        return False
+
+    def report(self):
+        times = sorted(self.frame_times)
+        ms = lambda t: None if t is None else round(t * 1000.0, 4)
+        report = {
+            "frames": len(times),
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "frame_ms": {
+                "mean": ms(sum(times) / len(times)) if times else None,
+                "p50": ms(percentile(times, 50)),
+                "p95": ms(percentile(times, 95)),
+                "p99": ms(percentile(times, 99)),
+                "max": ms(times[-1] if times else None),
+            },
+            "rasterizations": self.counters.rasterizations,
+            "allocations": self.counters.allocations,
+        }
+        if self.hash_frames:
+            report["frame_hashes"] = dict((str(n), h) for (n, h) in sorted(self.frame_hashes.items()))
+        return report
+
+    def write(self, filename=None):
+        data = json.dumps(self.report(), indent=2, sort_keys=True)
+        if filename:
+            f = open(filename, "w")
+            f.write(data + "\n")
+            f.close()
+        else:
+            sys.stdout.write(data + "\n")
+
+def add_options(parser):
+    parser.add_option("--headless", default=False, action="store_true",
+                      dest="headless", help="render offscreen as fast as possible and report frame times")
+    parser.add_option("--frames", type="int", default=1000, action="store",
+                      dest="frames", help="number of frames to render in headless mode")
+    parser.add_option("--bench-json", type="string", default=None, action="store",
+                      dest="bench_json", help="write the headless report to this file instead of stdout")
+    parser.add_option("--hash-frames", type="string", default=None, action="store",
+                      dest="hash_frames", help="in headless mode, report hashes of every [n]-th frame or of the frames at the quarters of each scene (quarters)")
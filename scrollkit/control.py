@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# pushing scores to a running scroller, without touching the text file.
+#
+# the control server runs an asyncio loop in a thread of its own and accepts
+# changes as JSON, POSTed to http://127.0.0.1:port/. a change is one object
+# or a list of them (a batch, applied in one go):
+#
+#   {"op": "set", "title": "Defender", "score": "19.999 XYZ"}  new score, or a new pair at the end
+#   {"op": "delete", "title": "Defender"}
+#   {"op": "replace", "pairs": [["Defender", "19.999 XYZ"], ...]}  the whole text
+#
+#   curl -d '{"op": "set", "title": "Defender", "score": "19.999 XYZ"}' http://127.0.0.1:8082/
+#
+# changes are queued for the text loader, which applies them to the current
+# text and prepares it like a reloaded file. the crawl and the ticker switch
+# to the result within a frame, the score scenes from their next scene on.
+# changes that would leave no title/score pair are rejected. pushed changes
+# live in memory only: when the text file changes, its contents replace the
+# text, pushed changes included.
+
+import json, threading
+
+MAX_BODY = 16 * 1024 * 1024
+
+def parse_line(value, what):
+    if not isinstance(value, str):
+        raise ValueError("%s must be a string" % what)
+    value = value.strip()
+    if not value or "\n" in value or "\r" in value:
+        raise ValueError("%s must be a single non-empty line" % what)
+    return value
+
+def parse_changes(data):
+    # validates a change or a list of them, returns them as tuples
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError("expected a change or a list of changes")
+    changes = []
+    for change in data:
+        if not isinstance(change, dict):
+            raise ValueError("a change must be an object")
+        op = change.get("op")
+        if op == "set":
+            changes.append(("set", parse_line(change.get("title"), "title"), parse_line(change.get("score"), "score")))
+        elif op == "delete":
+            changes.append(("delete", parse_line(change.get("title"), "title")))
+        elif op == "replace":
+            pairs = change.get("pairs")
+            if not isinstance(pairs, list) or [pair for pair in pairs if not isinstance(pair, list) or len(pair) != 2]:
+                raise ValueError("pairs must be a list of [title, score] lists")
+            changes.append(("replace", [(parse_line(title, "title"), parse_line(score, "score")) for (title, score) in pairs]))
+        else:
+            raise ValueError("unknown op %r" % (op,))
+    return changes
+
+def apply_changes(text, changes):
+    # returns the lines of text with the changes applied
+    lines = list(text)
+    rest = lines[len(lines) - len(lines) % 2:] # a title without score stays last
+    pairs = [[lines[i], lines[i + 1]] for i in range(0, len(lines) - 1, 2)]
+    for change in changes:
+        if change[0] == "replace":
+            pairs = [list(pair) for pair in change[1]]
+            continue
+        titles = [pair[0] for pair in pairs]
+        if change[0] == "set":
+            (op, title, score) = change
+            if title in titles:
+                pairs[titles.index(title)][1] = score
+            else:
+                pairs.append([title, score])
+        elif change[0] == "delete":
+            pairs = [pair for pair in pairs if pair[0] != change[1]]
+    return [line for pair in pairs for line in pair] + rest
+
+class ControlServer(threading.Thread):
+    # hands the changes POSTed to http://127.0.0.1:port/ to loader.push()
+
+    def __init__(self, loader, port):
+        threading.Thread.__init__(self, name="control-server")
+        self.daemon = True
+        import asyncio # takes longer to import than all the rest of our startup, so only when needed
+        self.loader = loader
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", port))
+
+    def run(self):
+        import asyncio
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def handle(self, reader, writer):
+        import asyncio
+        try:
+            (status, reply) = await asyncio.wait_for(self.request(reader), 10)
+        except (ValueError, UnicodeDecodeError) as e:
+            (status, reply) = (400, { "error": str(e) })
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        data = (json.dumps(reply) + "\n").encode("utf-8")
+        writer.write(("HTTP/1.0 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                      % (status, { 202: "Accepted", 400: "Bad Request", 405: "Method Not Allowed",
+                                   413: "Payload Too Large" }[status], len(data))).encode("ascii") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def request(self, reader):
+        (method, path, version) = (await reader.readline()).decode("latin-1").split(None, 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            (name, sep, value) = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if method != "POST":
+            return (405, { "error": "POST changes as JSON" })
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            return (413, { "error": "at most %d bytes per request" % MAX_BODY })
+        changes = parse_changes(json.loads((await reader.readexactly(length)).decode("utf-8")))
+        self.loader.push(changes)
+        return (202, { "queued": len(changes) })
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(1.0)
+
+def add_options(parser):
+    parser.add_option("--control-port", type="int", default=None, action="store",
+                      dest="control_port", help="accept pushed scores as JSON on http://127.0.0.1:[port]/ (see scrollkit/control.py)")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# animation curves for the transitions of the score scenes.
+#
+# a curve maps the number of frames since a transition started to an x
+# offset in pixels. curves are functions of the scene's frames, not of the
+# frames drawn, so they look the same at every --speed and when frames are
+# skipped. each curve is sampled once per length into a table of integers;
+# drawing a frame only looks its offset up.
+#
+# new transitions are added by registering a curve here and choosing it
+# with the scene effect's --build-curve, --hold-curve or --exit-curve.
+
+import array, threading
+
+CURVES = {}
+
+def curve(name):
+    # registers the decorated function f(frame) -> x offset as a curve
+    def register(function):
+        CURVES[name] = function
+        return function
+    return register
+
+@curve("linear")
+def linear(f):
+    # one pixel per frame, i.e. line 2 built up from the center
+    return f
+
+@curve("hold")
+def hold(f):
+    return 0
+
+accelerated_steps = [(0.0, 10.5)] # (x, speed) after each step, summed up like it used to be
+
+@curve("accelerated")
+def accelerated(f):
+    # starts fast, slows down, turns and leaves to the other side. it was
+    # tuned in steps of three frames (starting at 10.5 pixels per step,
+    # slowing down by 0.35 per step). the steps are added up one by one, so
+    # at speed 3 it matches the old drawing, rounding included; in between
+    # line 2 moves on at the step's speed
+    (steps, rest) = divmod(f, 3)
+    while len(accelerated_steps) <= steps:
+        (x, speed) = accelerated_steps[-1]
+        accelerated_steps.append((x + speed, speed - 0.35))
+    (x, speed) = accelerated_steps[steps]
+    return x + speed * rest / 3.0
+
+@curve("ease-in")
+def ease_in(f):
+    # leaves to one side, faster and faster
+    return 0.01 * f * f
+
+tables = {}
+tables_lock = threading.Lock()
+
+def table(name, length):
+    # the offsets of curve name for frames 0..length-1
+    key = (name, length)
+    with tables_lock:
+        offsets = tables.get(key)
+        if offsets is None:
+            function = CURVES[name]
+            offsets = tables[key] = array.array("l", [int(function(f)) for f in range(length)])
+        return offsets
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+from scrollkit.effects.base import Effect
+from scrollkit.effects.ticker import TickerEffect
+from scrollkit.effects.scene import SceneEffect
+from scrollkit.effects.crawl import CrawlEffect
+
+EFFECTS = dict((effect.name, effect) for effect in (TickerEffect, SceneEffect, CrawlEffect))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+class Effect(object):
+    # an effect shows the text model in scenes of frames_max frames, or in
+    # one endless scene if frames_max is None. the engine owns everything
+    # else (screen, timing, fonts, reloading), so an effect only has to
+    # prepare the text model and to render single frames of a scene.
+    #
+    # prepare() runs on the loader thread whenever the text changed. it must
+    # only create new objects and return them; the engine hands its result
+    # to begin() at the next scene boundary, on the render thread. change
+    # tells how the text differs from the one prepared before (see
+    # scrollkit.textdiff), None for the first text.
+
+    name = None
+    frames_max = None
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.options = engine.options
+        self.assets = engine.assets
+        self.state = None
+
+    @classmethod
+    def add_options(cls, parser):
+        pass
+
+    def prepare(self, text_model, change=None):
+        return text_model
+
+    def begin(self, state, changed, position=None):
+        # starts a new scene, returns its first frame. a position (see
+        # position()) makes it show that part of the text instead of the next
+        self.state = state
+        return 0
+
+    def update(self, state, frame):
+        # the text changed during a scene. an effect that can switch to the
+        # new state right away does so and returns the frame to go on with,
+        # showing the same part of the text. None leaves the state to begin()
+        return None
+
+    def cycle_scenes(self, state):
+        # the number of scenes until the effect shows the same scene again
+        return 1
+
+    def position(self):
+        # which part of the text the current scene shows, for other processes
+        # to show the same (see scrollkit.wall). None if it is always the same
+        return None
+
+    def render(self, frame, target):
+        # draws the frame onto the (cleared) target. returns the list of
+        # rects drawn to, or None to have the whole target presented
+        raise NotImplementedError
+
+    def end(self):
+        # the scene is over
+        pass
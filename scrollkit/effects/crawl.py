@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+
+# all scores' texts on one tall strip (the "scroll"), crawling away in
+# perspective like the opening of a well known space opera.
+#
+# the scroll is never rendered as a whole. only its layout (where each pair of
+# lines goes) is kept, measured without rendering anything. the rows on
+# screen are rendered into a window of two bands, which moves down band by
+# band as the scroll crawls on. the first window is kept, so restarting the
+# crawl with the same text does not render anything.
+#
+# when the text changes, the crawl switches to the new scroll right away and
+# goes on at the same pair of lines. the windows are kept if they show the
+# same there; otherwise only the lines that changed need to be rendered anew.
+
+import array, bisect, sys
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from scrollkit.effects.base import Effect
+from scrollkit.wall import Viewport
+
+# the perspective crawl: 400 scanlines, each one a row of the scroll scaled
+# down to the scanline's width and centered horizontally. the geometry of
+# the scanlines is the same in every frame, only the scroll row they show moves.
+
+def crawl_scanlines(y_pos):
+    # yields (scan_row, y, w) for all scanlines from top to bottom
+    w = 200
+    y = y_pos
+    a = 0.4
+    for scan_row in range(0, 400):
+        yield (scan_row, y, w)
+        y += a
+        a = a + 0.001
+        w += 2
+
+class Scroll(object):
+    # the layout of the scroll plus the window of it that is rendered
+
+    band_height = 512 # >= the 400 scanlines, so a frame never needs more than two bands
+
+    def __init__(self, text, assets, options, change=None):
+        self.text = text
+        self.assets = assets
+        self.options = options
+        self.change = change # how the text differs from the one before
+
+        # the top of each pair of lines, and the height of the whole scroll.
+        # pairs are 30 pixels apart, but the height reserves 60 pixels for
+        # each, which leaves some room at the end of the scroll
+        self.tops = array.array("q")
+        self.height = 0
+        scroll_y = 0
+        for text_pos in range(0, len(text) - 1, 2):
+            self.tops.append(scroll_y)
+
+            # line1 is the game title (odd line numbers in the text file)
+            scroll_y += assets.size(text[text_pos], options.font_size)[1] + 3
+
+            # line2 is the game score and the champions name (even line numbers in the text file)
+            scroll_y += assets.size(text[text_pos + 1], options.font_size2)[1] + 3 + 30
+            self.height = scroll_y + 30 * len(self.tops)
+
+        self.window = None
+        self.window_top = None
+        self.head = None # the first window
+        self.version = 0 # changes whenever the window's contents change
+
+    def get_height(self):
+        return self.height
+
+    def pairs(self, top, bottom):
+        # the pairs of lines shown in scroll rows top..bottom-1
+        pair = max(0, bisect.bisect_right(self.tops, top) - 1)
+        return range(pair, bisect.bisect_left(self.tops, bottom))
+
+    def shows(self, top, bottom):
+        # what scroll rows top..bottom-1 show: the pairs of lines and where they are
+        return [(self.tops[pair], self.text[pair * 2], self.text[pair * 2 + 1]) for pair in self.pairs(top, bottom)]
+
+    def follow(self, old, row):
+        # where row of the old scroll (the one of the text before) is on this
+        # one: on the same pair of lines, or on what took its place
+        if row < 0 or len(old.tops) == 0:
+            return row
+        if row >= old.height:
+            return row + self.height - old.height # in the space after the text
+        pair = bisect.bisect_right(old.tops, row) - 1
+        new_pair = self.change.pairs().map(pair)
+        if new_pair is None:
+            return row
+        bottom = self.tops[new_pair + 1] if new_pair + 1 < len(self.tops) else self.height
+        return self.tops[new_pair] + min(row - old.tops[pair], bottom - self.tops[new_pair] - 1)
+
+    def adopt(self, old):
+        # takes over the windows of the old scroll which show the same on this one
+        b = self.band_height
+        if old.head is not None and old.shows(0, 2 * b) == self.shows(0, 2 * b):
+            self.head = old.head
+        if old.window_top is not None \
+           and old.shows(old.window_top, old.window_top + 2 * b) == self.shows(old.window_top, old.window_top + 2 * b):
+            (self.window, self.window_top, self.version) = (old.window, old.window_top, old.version)
+
+    def prerender(self, top, bottom, pool=False):
+        # renders the lines of scroll rows top..bottom-1 in one batch (see Assets.prerender())
+        options = self.options
+        requests = []
+        for pair in self.pairs(top, bottom):
+            requests.append((self.text[pair * 2], options.font_size, options.text_color))
+            requests.append((self.text[pair * 2 + 1], options.font_size2, options.text_color))
+        self.assets.prerender(requests, pool)
+
+    def render_rows(self, top, bottom):
+        # renders scroll rows top..bottom-1 into the window (which must hold them)
+        options = self.options
+        self.prerender(top, bottom)
+        self.window.set_clip((0, top - self.window_top, options.width, bottom - top))
+        self.window.fill(options.bg_color)
+        for pair in self.pairs(top, bottom):
+            text_pos = pair * 2
+            scroll_y = self.tops[pair] - self.window_top
+
+            # line1 is the game title (odd line numbers in the text file)
+            text1 = self.assets.render(self.text[text_pos], options.font_size, options.text_color)
+            self.window.blit(text1, ((options.width - text1.get_width() ) // 2, scroll_y))
+            scroll_y += text1.get_height() + 3
+
+            # line2 is the game score and the champions name (even line numbers in the text file)
+            text2 = self.assets.render(self.text[text_pos + 1], options.font_size2, options.text_color)
+            self.window.blit(text2, ((options.width - text2.get_width() ) // 2, scroll_y))
+        self.window.set_clip(None)
+        self.version += 1
+
+    def rows(self, top, bottom):
+        # returns (surface, y): a surface showing scroll rows top..bottom-1,
+        # its first row being scroll row y
+        b = self.band_height
+        if self.window is None:
+            self.window = pygame.Surface((self.options.width, 2 * b))
+        if self.window_top is not None and self.window_top <= top and bottom <= self.window_top + 2 * b:
+            return (self.window, self.window_top)
+
+        window_top = top // b * b
+        if self.window_top is not None and window_top == self.window_top + b:
+            # crawled on by one band: keep the lower band, render the next one
+            self.window.scroll(0, -b)
+            self.window_top = window_top
+            self.render_rows(window_top + b, window_top + 2 * b)
+        elif window_top == 0 and self.head is not None:
+            # the crawl starts over
+            self.window.blit(self.head, (0, 0))
+            self.window_top = window_top
+            self.version += 1
+        else:
+            self.window_top = window_top
+            self.render_rows(window_top, window_top + 2 * b)
+            if window_top == 0:
+                self.head = self.window.copy()
+        return (self.window, self.window_top)
+
+class LegacyCrawl(object):
+    # scales every scanline separately through a temporary 1-pixel high surface
+
+    def __init__(self, options, screen, y_pos):
+        self.options = options
+        self.y_pos = y_pos
+
+    def draw(self, screen, scroll, frame):
+        # returns the rects drawn to
+        rects = []
+        (window, window_top) = scroll.rows(max(0, frame - 400), min(frame, scroll.get_height()))
+        for (scan_row, y, w) in crawl_scanlines(self.y_pos):
+            row = (frame - 400 + scan_row)
+
+            if row >= 0 and row < scroll.get_height():
+                scanline = pygame.Surface((window.get_width(), 1))
+                scanline.blit(window, (0, 0), area=((0, row - window_top), (window.get_width(), 1)))
+                # scanline.fill(options.text_color)
+                scanline = pygame.transform.scale(scanline, (w, 1))
+
+                x = (screen.get_width() - scanline.get_width()) // 2
+                rects.append(screen.blit(scanline, (x, y)))
+        if not rects:
+            return rects
+        return [rects[0].unionall(rects[1:])]
+
+class FastCrawl(object):
+    # copies the pixels of all visible scanlines in one numpy gather.
+    # the destination pixel, source column and scanline of every pixel of the
+    # trapezoid are computed once. the source columns are taken from
+    # pygame.transform.scale itself (by scaling a row of column indices), so
+    # the result is pixel-identical to LegacyCrawl.
+    #
+    # several scanlines can end up on the same screen row; legacy drawing lets
+    # the last one (which is also the widest) win. so only the last scanline of
+    # each screen row is kept, plus the last visible scanline of a row that is
+    # only partly visible at the lower edge of the scroll.
+    #
+    # on a viewport of a wall, all of this happens in screen coordinates, so
+    # only the pixels of the viewport are copied.
+
+    pixel_types = { 1: numpy.uint8, 2: numpy.uint16, 4: numpy.uint32 } if numpy else {}
+
+    def __init__(self, options, target, y_pos):
+        self.options = options
+        self.window = None
+        self.src = None
+
+        (screen, offset) = (target, (0, 0))
+        if isinstance(target, Viewport):
+            (screen, offset) = (target.surface, target.offset)
+        clip = screen.get_clip()
+        screen_pitch = screen.get_pitch() // screen.get_bytesize()
+        scanlines = list(crawl_scanlines(y_pos))
+        rows = [int(y) - offset[1] for (scan_row, y, w) in scanlines]
+
+        # per scanline: (scan_row, source column, destination index) of its pixels
+        pixels = []
+        for (scan_row, y, w) in scanlines:
+            x = (target.get_width() - w) // 2 - offset[0] + numpy.arange(w)
+            visible = (x >= clip.left) & (x < clip.right)
+            if not (clip.top <= rows[scan_row] < clip.bottom):
+                visible[:] = False
+            pixels.append((numpy.full(visible.sum(), scan_row),
+                           self.column_map(options.width, w)[visible],
+                           rows[scan_row] * screen_pitch + x[visible]))
+
+        # scanlines that are the last one on their screen row, in ascending order
+        self.last_rows = [s for s in range(len(rows)) if s + 1 == len(rows) or rows[s + 1] != rows[s]]
+        self.last_pixels = [numpy.concatenate([pixels[s][i] for s in self.last_rows]) for i in range(3)]
+        self.last_starts = numpy.searchsorted(self.last_pixels[0], self.last_rows + [len(rows)])
+        self.rows = rows
+        self.pixels = pixels
+        self.widths = [w for (scan_row, y, w) in scanlines]
+        self.screen = screen
+        self.left = (target.get_width() - numpy.array(self.widths)) // 2 - offset[0]
+        self.clip = clip
+
+    def column_map(self, src_width, dst_width):
+        index = pygame.Surface((src_width, 1), 0, 32)
+        pygame.surfarray.pixels2d(index)[:, 0] = numpy.arange(src_width)
+        scaled = pygame.transform.scale(index, (dst_width, 1))
+        return pygame.surfarray.array2d(scaled)[:, 0].astype(numpy.intp)
+
+    def draw(self, target, scroll, frame):
+        screen = self.screen
+
+        # scanlines lo..hi-1 show a row of the scroll
+        lo = max(0, 400 - frame)
+        hi = min(400, 400 - frame + scroll.get_height())
+        if lo >= hi:
+            return []
+
+        (window, window_top) = scroll.rows(frame - 400 + lo, frame - 400 + hi)
+        if (window, scroll.version) != self.window:
+            # raw pixel copies need the window in the screen's pixel format
+            self.window = (window, scroll.version)
+            if window.get_bitsize() == screen.get_bitsize() \
+               and window.get_masks() == screen.get_masks():
+                self.src = window
+            else:
+                self.src = window.convert(screen)
+            self.src_pitch = self.src.get_pitch() // self.src.get_bytesize()
+
+        a = bisect.bisect_left(self.last_rows, lo)
+        b = bisect.bisect_left(self.last_rows, hi)
+        (s, c, d) = [p[self.last_starts[a]:self.last_starts[b]] for p in self.last_pixels]
+        if hi < 400 and self.rows[hi] == self.rows[hi - 1]:
+            # the lowest visible scanline shares its screen row with hidden ones
+            (s, c, d) = [numpy.concatenate((p, q)) for (p, q) in zip((s, c, d), self.pixels[hi - 1])]
+
+        pixel_type = self.pixel_types[screen.get_bytesize()]
+        dst = numpy.frombuffer(screen.get_buffer(), pixel_type)
+        src = numpy.frombuffer(self.src.get_buffer(), pixel_type)
+        dst[d] = src[(s + (frame - 400 - window_top)) * self.src_pitch + c]
+        del dst, src
+
+        # the drawn trapezoid is as wide as its lowest scanline
+        w = self.widths[hi - 1]
+        band = pygame.Rect(int(self.left[hi - 1]), self.rows[lo], w, self.rows[hi - 1] - self.rows[lo] + 1)
+        return [band.clip(self.clip)]
+
+CRAWL_ENGINES = { "legacy": LegacyCrawl, "fast": FastCrawl }
+
+class CrawlEffect(Effect):
+
+    name = "crawl"
+
+    @classmethod
+    def add_options(cls, parser):
+        parser.add_option("--crawl-engine", type="choice", choices=sorted(CRAWL_ENGINES.keys()),
+                          default="fast" if numpy else "legacy", action="store",
+                          dest="crawl_engine", help="crawl renderer: legacy or fast (needs numpy)")
+
+    def __init__(self, engine):
+        Effect.__init__(self, engine)
+        self.crawl = None
+        self.frame = None # the frame drawn last
+
+    @staticmethod
+    def fast_engine_available():
+        return numpy is not None
+
+    def follows(self, scroll):
+        # whether scroll is of a change of the text crawling by
+        return scroll.change is not None and self.state is not None and scroll.change.old is self.state.text
+
+    def prepare(self, text, change=None):
+        # runs on the loader thread: lay out all scores' texts on the scroll
+        # and render the lines shown first
+        scroll = Scroll(text, self.assets, self.options, change)
+        scroll.prerender(0, 2 * scroll.band_height, pool=True)
+        if self.follows(scroll) and self.frame is not None:
+            # and the ones around where update() will go on
+            frame = scroll.follow(self.state, self.frame - 1) + 1
+            scroll.prerender(max(0, frame - 400), frame + scroll.band_height, pool=True)
+        return scroll
+
+    def begin(self, state, changed, position=None):
+        self.state = state
+        self.frames_max = state.get_height() + 400
+        return 0
+
+    def update(self, state, frame):
+        if not self.follows(state):
+            return None
+        # the lowest (largest) row on screen stays on its pair of lines
+        frame = state.follow(self.state, frame - 1) + 1
+        state.adopt(self.state)
+        self.begin(state, True)
+        return frame
+
+    def render(self, frame, target):
+        if self.crawl is None:
+            y_pos = self.options.y_pos
+            if y_pos == None:
+                y_pos = 360
+            engine = self.options.crawl_engine
+            screen = target.surface if isinstance(target, Viewport) else target
+            if engine == "fast" and screen.get_bytesize() not in FastCrawl.pixel_types:
+                sys.stderr.write("%d bit screens are not supported by the fast crawl engine, using legacy\n" % screen.get_bitsize())
+                engine = "legacy"
+            self.crawl = CRAWL_ENGINES[engine](self.options, target, y_pos)
+        self.frame = frame
+        return self.crawl.draw(target, self.state, frame)
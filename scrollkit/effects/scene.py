@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+
+# for each score set (pair of two lines) we show one scene of screen_width*2 frames
+# each scene is separated in 4 quarters (one quarter = screen_width/2 frames)
+# line 1 behaves identically in all 4 quarters (it's a simple scroller)
+# line 2 behaves differently in each quarter
+#    1st quarter: build up line two frome the center of screen
+#    2nd quarter: do nothing, just show line 2 centered
+#    3rd and 4th quarter: scroll away line2 using an accelerated scrolling
+#
+# how line 2 moves in each of these transitions is up to animation curves
+# (see scrollkit.curves).
+#
+# a scene only depends on its pair of lines (and the options), so it is
+# compiled once into a timeline: the list of blits for every frame. showing
+# a frame just replays its blits. timelines are cached per pair of lines and
+# reused whenever the rotation comes back to that pair.
+#
+# the blits of a frame are replayed by a scene engine: blit (pygame's blits)
+# or surfarray (numpy slice copies straight into the screen's pixels).
+
+import collections, random, sys
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from scrollkit import curves
+from scrollkit.effects.base import Effect
+from scrollkit.wall import Viewport
+
+class Timeline(object):
+    # the frames of one scene, starting at frame start, one every step
+    # frames. each frame is a list of (surface, dest, area) blits; a surface
+    # of None fills dest with the background color
+
+    def __init__(self, start, step, frames):
+        self.start = start
+        self.step = step
+        self.frames = frames
+
+    def ops(self, frame):
+        i = (frame - self.start) // self.step
+        return self.frames[max(0, min(len(self.frames) - 1, i))]
+
+def paint_spans(spans, x, src_width, dst_width):
+    # what a temp surface of dst_width shows after blitting a surface of
+    # src_width at x onto it: a sorted list of (x0, x1, src_x0) spans
+    x0 = max(0, x)
+    x1 = min(dst_width, x + src_width)
+    if x0 >= x1:
+        return spans
+    result = []
+    for (a, b, s) in spans:
+        if a < x0:
+            result.append((a, min(b, x0), s))
+        if b > x1:
+            result.append((max(a, x1), b, s + max(a, x1) - a))
+    result.append((x0, x1, x0 - x))
+    return sorted(result)
+
+def compile_scene(options, assets, title, score, flip):
+    # simulates the scene frame by frame, exactly like drawing it directly
+    # would do, and records the blits of each frame
+    width = options.width
+
+    # we have one surface per text line (line1 and line2).
+    # each surface has the full screen width, the full text's
+    # height. the text is placed centered on that surface.
+
+    # line1 is the game title (odd line numbers in the text file)
+    text1 = assets.render(title, options.font_size, options.text_color)
+    line1 = pygame.Surface((width, text1.get_height()))
+    line1.fill(options.bg_color)
+    line1.blit(text1, ((width - text1.get_width() ) // 2, 0))
+
+    # line2 is the game score and the champions name (even line numbers in the text file)
+    text2 = assets.render(score, options.font_size2, options.text_color)
+    line2 = pygame.Surface((width, text2.get_height()))
+    line2.fill(options.bg_color)
+    line2.blit(text2, ((width - text2.get_width() ) // 2, 0))
+    height2 = text2.get_height()
+
+    frames_max = width * 2 # scene duration
+    end = frames_max
+    if options.debug_end_frame != None:
+        end = min(end, options.debug_end_frame)
+
+    # skip a few frames in the beginning if neither of the two lines is very wide
+    #   this avoids too long pauses between two scenes
+    start = (width - max(text1.get_width(), text2.get_width())) // 2
+    if options.debug_start_frame != None:
+        start = options.debug_start_frame
+
+    # the x offsets of line 2 in each transition
+    build = curves.table(options.build_curve, width // 2)
+    hold = curves.table(options.hold_curve, width // 2)
+    leave = curves.table(options.exit_curve, frames_max - width)
+    # line 2 leaves from the first frame drawn in the 3rd quarter on
+    leave_start = start + max(0, -(-(width - start) // options.speed)) * options.speed
+
+    # flip scrolling direction in 2nd half:
+    #    1st score line leaves to the left, 2nd leaves to right, 3rd to the left...
+    direction = -1 if flip else 1
+
+    # in the 1st quarter line 2 used to be blitted into two temp surfaces (left
+    # and right half of the screen), which keep what was blitted before. we
+    # only track which parts of line 2 they show and blit those directly
+    temps = [(0, []), (width // 2, [])]
+
+    frames = []
+    frame = start
+    while True:
+        quarter = frame * 4 // frames_max         # ranging from 0..3
+        quarter_step = frame % (frames_max // 4)  # ranging i.e. 0..319 in each quarter
+
+        # that is all to handle the game title scrolling
+        ops = [(line1, (width - frame, options.y_pos1), None)]
+        title_rect = pygame.Rect((width - frame, options.y_pos1), line1.get_size())
+
+        if quarter == 0: # build up line 2 from the center
+            temps[0] = (0, paint_spans(temps[0][1], width // 2 - build[quarter_step], width, width // 2))
+            temps[1] = (width // 2, paint_spans(temps[1][1], - width + build[quarter_step], width, width // 2))
+            for (temp_x, spans) in temps:
+                temp_rect = pygame.Rect(temp_x, options.y_pos2, width // 2, height2)
+                if temp_rect.colliderect(title_rect):
+                    ops.append((None, temp_rect, None)) # the temp surface's background covered the title
+                for (x0, x1, src_x0) in spans:
+                    ops.append((line2, (temp_x + x0, options.y_pos2), pygame.Rect(src_x0, 0, x1 - x0, height2)))
+
+        elif quarter == 1: # just show line 2
+            ops.append((line2, (hold[quarter_step], options.y_pos2), None))
+
+        else: # quarter == 2 or quarter == 3: # scroll away line 2
+            x_pos2 = direction * leave[max(0, min(len(leave) - 1, frame - leave_start))]
+            if abs(x_pos2) < width:
+                ops.append((line2, (x_pos2, options.y_pos2), None))
+
+        frames.append(ops)
+
+        frame += options.speed
+        if frame >= end:
+            break
+
+    return Timeline(start, options.speed, frames)
+
+class BlitScene(object):
+    # replays the blits of a frame
+
+    def __init__(self, options, target):
+        self.options = options
+
+    def draw(self, target, timeline, frame):
+        rects = []
+        for (surface, dest, area) in timeline.ops(frame):
+            if surface is None:
+                rects.append(target.fill(self.options.bg_color, dest))
+            else:
+                rects.append(target.blit(surface, dest, area))
+        return rects
+
+class SurfarrayScene(object):
+    # copies the pixels of every blit of a frame with numpy slices, straight
+    # into the screen's pixels (pygame.surfarray.pixels2d). the line surfaces
+    # are opaque, so blitting them is a plain copy of their pixels, and
+    # converted to the screen's pixel format once per scene the result is
+    # pixel-identical to BlitScene. on a viewport of a wall the copies are
+    # clipped to the screen, like blits are.
+
+    pixel_sizes = (1, 2, 4) # what pixels2d supports
+
+    def __init__(self, options, target):
+        (screen, offset) = (target, (0, 0))
+        if isinstance(target, Viewport):
+            (screen, offset) = (target.surface, target.offset)
+        self.screen = screen
+        self.offset = offset
+        self.clip = screen.get_clip()
+        self.bg = screen.map_rgb(options.bg_color)
+        self.timeline = None
+        self.sources = {} # line surface -> its pixels in the screen's format, by rows
+
+    def source(self, surface):
+        pixels = self.sources.get(surface)
+        if pixels is None:
+            pixels = self.sources[surface] = numpy.ascontiguousarray(pygame.surfarray.array2d(surface.convert(self.screen)).T)
+        return pixels
+
+    def draw(self, target, timeline, frame):
+        if timeline is not self.timeline:
+            self.timeline = timeline
+            self.sources = {}
+        (ox, oy) = self.offset
+        rects = []
+        dst = pygame.surfarray.pixels2d(self.screen).T # indexed [y, x], so rows are copied in one go
+        for (surface, dest, area) in timeline.ops(frame):
+            if surface is None:
+                rect = pygame.Rect(dest).move(-ox, -oy).clip(self.clip)
+                dst[rect.top:rect.bottom, rect.left:rect.right] = self.bg
+                rects.append(rect)
+                continue
+            src = pygame.Rect(area) if area is not None else surface.get_rect()
+            src = src.clip(surface.get_rect())
+            rect = pygame.Rect((dest[0] - ox, dest[1] - oy), src.size)
+            clipped = rect.clip(self.clip)
+            if clipped.width > 0 and clipped.height > 0:
+                (sx, sy) = (src.left + clipped.left - rect.left, src.top + clipped.top - rect.top)
+                dst[clipped.top:clipped.bottom, clipped.left:clipped.right] = \
+                    self.source(surface)[sy:sy + clipped.height, sx:sx + clipped.width]
+                rects.append(clipped)
+            else:
+                rects.append(pygame.Rect(rect.topleft, (0, 0)))
+        del dst
+        return rects
+
+SCENE_ENGINES = { "blit": BlitScene, "surfarray": SurfarrayScene }
+
+def paired(lines):
+    # the number of lines in complete pairs, a title without score is not shown
+    return len(lines) - len(lines) % 2
+
+class SceneText(object):
+    # a prepared text: its lines, the pair to start with, the timeline of the
+    # first scene and how it differs from the text before
+
+    def __init__(self, lines, text_pos, timelines, change=None):
+        self.lines = lines
+        self.text_pos = text_pos
+        self.timelines = timelines
+        self.change = change
+
+class SceneEffect(Effect):
+
+    name = "scene"
+
+    @classmethod
+    def add_options(cls, parser):
+        parser.add_option("--y-pos1", type="int", default=360, action="store",
+                          dest="y_pos1", help="y position of row 1")
+        parser.add_option("--y-pos2", type="int", default=440, action="store",
+                          dest="y_pos2", help="y position of row 2")
+        parser.add_option("--text-start-random", default=True, action="store",
+                          dest="text_start_random", help="start scrolling by first line or by a random line")
+        parser.add_option("--scene-engine", type="choice", choices=sorted(SCENE_ENGINES.keys()),
+                          default="blit", action="store",
+                          dest="scene_engine", help="scene renderer: blit or surfarray (needs numpy)")
+        parser.add_option("--scene-cache-size", type="int", default=32, action="store",
+                          dest="scene_cache_size", help="max. number of compiled scenes to keep")
+        for (name, default, what) in (("build", "linear", "building up"), ("hold", "hold", "showing"),
+                                      ("exit", "accelerated", "scrolling away")):
+            parser.add_option("--%s-curve" % name, type="choice", choices=sorted(curves.CURVES.keys()),
+                              default=default, action="store", dest="%s_curve" % name,
+                              help="animation curve for %s line 2 (%s)" % (what, ", ".join(sorted(curves.CURVES.keys()))))
+
+    def __init__(self, engine):
+        Effect.__init__(self, engine)
+        self.text_pos = 0
+        self.timelines = collections.OrderedDict()
+        self.timeline = None
+        self.renderer = None
+
+    @staticmethod
+    def surfarray_engine_available():
+        return numpy is not None
+
+    def scene_key(self, text, text_pos):
+        # flip scrolling direction in 2nd half:
+        #    1st score line leaves to the left, 2nd leaves to right, 3rd to the left...
+        if paired(text) == 0:
+            return None # no scores, empty scenes
+        return (text[text_pos], text[text_pos + 1], text_pos // 2 % 2 == 1)
+
+    def compile(self, text, text_pos):
+        key = self.scene_key(text, text_pos)
+        if key is None:
+            return Timeline(0, self.options.speed, [[]])
+        return compile_scene(self.options, self.assets, *key)
+
+    def follows(self, state):
+        # whether state is a change of the text shown so far
+        return state.change is not None and self.state is not None and state.change.old is self.state.lines
+
+    def follow(self, change, text_pos):
+        # where the pair at text_pos of the old text is in the new one
+        pair = change.pairs().map(text_pos // 2)
+        return 0 if pair is None else pair * 2
+
+    def prepare(self, text, change=None):
+        # runs on the loader thread: choose the first pair and compile its scene
+        state = SceneText(text, 0, {}, change)
+        if self.follows(state):
+            # go on where we are (begin() looks again, we may have moved on by then)
+            text_pos = self.follow(change, self.text_pos)
+        elif self.options.text_start_random and paired(text) > 0:
+            text_pos = random.randint(0, paired(text) - 1)
+            text_pos = text_pos - text_pos % 2
+        else:
+            text_pos = 0
+        state.text_pos = text_pos
+        state.timelines[self.scene_key(text, text_pos)] = self.compile(text, text_pos)
+        return state
+
+    def begin(self, state, changed, position=None):
+        follows = changed and self.follows(state)
+        self.state = state
+        self.frames_max = self.options.width * 2 # scene duration
+
+        if changed:
+            if follows:
+                self.text_pos = self.follow(state.change, self.text_pos)
+            else:
+                self.text_pos = state.text_pos
+            for (key, timeline) in state.timelines.items():
+                self.timelines[key] = timeline
+        if position is not None:
+            self.text_pos = position
+        self.text_pos = self.text_pos % paired(state.lines) if paired(state.lines) > 0 else 0
+
+        key = self.scene_key(state.lines, self.text_pos)
+        timeline = self.timelines.pop(key, None)
+        if timeline is None:
+            timeline = self.compile(state.lines, self.text_pos)
+            while len(self.timelines) >= self.options.scene_cache_size > 0:
+                self.timelines.popitem(last=False)
+        self.timelines[key] = timeline # (re-)insert as most recently used
+        self.timeline = timeline
+        return timeline.start
+
+    def position(self):
+        return self.text_pos
+
+    def cycle_scenes(self, state):
+        # every scene moves on by two lines
+        return max(1, paired(state.lines) // 2)
+
+    def render(self, frame, target):
+        if self.renderer is None:
+            engine = self.options.scene_engine
+            screen = target.surface if isinstance(target, Viewport) else target
+            if engine == "surfarray" and screen.get_bytesize() not in SurfarrayScene.pixel_sizes:
+                sys.stderr.write("%d bit screens are not supported by the surfarray scene engine, using blit\n" % screen.get_bitsize())
+                engine = "blit"
+            self.renderer = SCENE_ENGINES[engine](self.options, target)
+        return self.renderer.draw(target, self.timeline, frame)
+
+    def end(self):
+        self.text_pos = (self.text_pos + 2) % max(2, paired(self.state.lines)) # get next pair of text lines
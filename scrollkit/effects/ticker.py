@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+# a simple horizontal ticker running through all lines of the text
+
+import bisect, collections, unicodedata
+import pygame
+
+from scrollkit.effects.base import Effect
+
+rises = {} # (font size, characters) -> how far they move the baseline down, see Tape.rise()
+
+def clusters(text):
+    # the characters of text, each with the combining marks following it
+    start = 0
+    for i in range(1, len(text) + 1):
+        if i == len(text) or not unicodedata.combining(text[i]):
+            yield text[start:i]
+            start = i
+
+class Tape(object):
+    # the whole message loop laid out as one continuous strip ("tape").
+    # the tape is split into tiles of a fixed width which are only rendered
+    # when they become visible and are evicted again in LRU order, so
+    # memory stays bounded for very long texts. short texts are repeated
+    # until the tape covers the screen width, so drawing a frame never
+    # takes more than three blits, no matter how many lines there are.
+    #
+    # when the text changes, the ticker goes on with the new tape at the same
+    # line and keeps the tiles that look the same on it.
+    #
+    # lines wider than --segment-width are split into segments of about that
+    # width, between characters. a tile only renders the segments on it, so
+    # a line of any length never becomes one surface (which SDL could not
+    # even create beyond some width). the segments are measured one by one,
+    # which puts them exactly where the whole line has its characters as
+    # long as the font does not kern (the monospaced ones do not).
+    #
+    # SDL_ttf moves the baseline of a whole string down when a glyph in it
+    # (i.e. one with a combining mark) reaches above the font's ascent. so
+    # the segments of a line taller than plain text are put on the line's
+    # baseline, by how far their characters move it down.
+
+    def __init__(self, text, assets, options, change=None):
+        self.assets = assets
+        self.options = options
+        self.text = text
+        self.lines = len(text)
+        self.change = change # how the text differs from the one before
+        # how high plain text is, with descenders
+        self.plain_height = max(assets.size(c, options.font_size)[1] for c in "gjpqy,;_|")
+
+        # lay out the chunks (line + separator, or segments of it) by their
+        # metrics only
+        self.chunks = []
+        self.offsets = []
+        self.tops = [] # where on the tape the chunks are drawn
+        self.line_offsets = [] # where each (repeated) line starts
+        self.width = 0
+        self.height = 0
+        while text and self.width < options.width:
+            for line in text:
+                self.line_offsets.append(self.width)
+                for (chunk, w, h, top) in self.segments(line + options.separator):
+                    self.chunks.append(chunk)
+                    self.offsets.append(self.width)
+                    self.tops.append(top)
+                    self.width += w
+                    self.height = max(self.height, top + h)
+
+        self.tile_width = max(options.width, options.tile_width)
+        self.tiles = collections.OrderedDict()
+
+    def segments(self, chunk):
+        # chunk split for the layout, as (text, width, height, top)
+        size = self.options.font_size
+        (w, h) = self.assets.size(chunk, size)
+        segment_width = self.options.segment_width
+        if segment_width <= 0 or w <= segment_width or len(chunk) < 2:
+            return [(chunk, w, h, 0)]
+        n = max(1, len(chunk) * segment_width // w) # characters per segment
+        segments = []
+        i = 0
+        while i < len(chunk):
+            j = min(i + n, len(chunk))
+            while j < len(chunk) and unicodedata.combining(chunk[j]):
+                j += 1 # accents stay with their characters
+            segments.append((chunk[i:j],) + tuple(self.assets.size(chunk[i:j], size)))
+            i = j
+        if h <= self.plain_height:
+            return [segment + (0,) for segment in segments]
+        rises = [max([self.rise(c) for c in clusters(text) if self.assets.size(c, size)[1] > self.plain_height] + [0])
+                 for (text, w, h) in segments]
+        return [segment + (max(rises) - rise,) for (segment, rise) in zip(segments, rises)]
+
+    def rise(self, c):
+        # how far character c (with its combining marks) moves the baseline
+        # of a string down: where an x in front of it is drawn, compared to
+        # an x alone
+        key = (self.options.font_size, c)
+        if key not in rises:
+            with self.assets.lock:
+                font = self.assets.font(self.options.font_size)
+                x = font.render("x", 1, self.options.text_color)
+                probe = font.render("x" + c, 1, self.options.text_color)
+                cell = (0, 0, min(x.get_width(), probe.get_width()), probe.get_height())
+                rises[key] = probe.subsurface(cell).get_bounding_rect().top - x.get_bounding_rect().top
+        return rises[key]
+
+    def tile(self, n, pool=False):
+        # pool: rendering on the loader thread (see Assets.prerender())
+        tile = self.tiles.pop(n, None)
+        if tile is None:
+            x0 = n * self.tile_width
+            x1 = min(x0 + self.tile_width, self.width)
+            tile = pygame.Surface((x1 - x0, self.height))
+            tile.fill(self.options.bg_color)
+            c = bisect.bisect_right(self.offsets, x0) - 1
+            # plus the chunk the next tile goes on with
+            chunks = self.chunks[c:bisect.bisect_left(self.offsets, x1) + 1]
+            self.assets.prerender([(chunk, self.options.font_size, self.options.text_color) for chunk in chunks], pool)
+            while c < len(self.chunks) and self.offsets[c] < x1:
+                chunk = self.assets.render(self.chunks[c], self.options.font_size, self.options.text_color)
+                tile.blit(chunk, (self.offsets[c] - x0, self.tops[c]))
+                c += 1
+            while len(self.tiles) >= self.options.max_tiles:
+                self.tiles.popitem(last=False)
+        self.tiles[n] = tile # (re-)insert as most recently used
+        return tile
+
+    def shows(self, n):
+        # what tile n shows: its size and the chunks on it
+        x0 = n * self.tile_width
+        x1 = min(x0 + self.tile_width, self.width)
+        chunks = range(bisect.bisect_right(self.offsets, x0) - 1, bisect.bisect_left(self.offsets, x1))
+        return (x1 - x0, self.height, [(self.offsets[c] - x0, self.tops[c], self.chunks[c]) for c in chunks])
+
+    def follow(self, old, pos):
+        # where tape position pos of the old tape (the one of the text before)
+        # is on this one: on the same line, or on what took its place
+        if pos < 0 or old.width == 0 or self.width == 0:
+            return pos
+        pos %= old.width
+        l = bisect.bisect_right(old.line_offsets, pos) - 1
+        (repeat, line) = divmod(l, old.lines)
+        new_line = self.change.lines().map(line)
+        if new_line is None:
+            return pos
+        new_l = min(repeat * self.lines + new_line, len(self.line_offsets) - 1)
+        end = self.line_offsets[new_l + 1] if new_l + 1 < len(self.line_offsets) else self.width
+        return self.line_offsets[new_l] + min(pos - old.line_offsets[l], end - self.line_offsets[new_l] - 1)
+
+    def adopt(self, old):
+        # takes over the tiles of the old tape which look the same on this one
+        tiles = collections.OrderedDict()
+        if old.tile_width == self.tile_width:
+            for (n, tile) in old.tiles.items():
+                if n * self.tile_width < self.width and old.shows(n) == self.shows(n):
+                    tiles[n] = tile
+        for (n, tile) in self.tiles.items():
+            tiles.pop(n, None)
+            tiles[n] = tile
+        while len(tiles) > self.options.max_tiles:
+            tiles.popitem(last=False)
+        self.tiles = tiles
+
+    def draw(self, screen, pos, y):
+        # show the tape starting at tape position pos on the left edge of
+        # the screen. negative positions leave the screen blank on the left.
+        # returns the rects drawn to
+        rects = []
+        if self.width == 0:
+            return rects
+        x = max(0, -pos)
+        pos = max(0, pos) % self.width
+        while x < self.options.width:
+            n = pos // self.tile_width
+            tile = self.tile(n)
+            src_x = pos - n * self.tile_width
+            w = min(tile.get_width() - src_x, self.options.width - x)
+            rects.append(screen.blit(tile, (x, y), area=((src_x, 0), (w, self.height))))
+            x += w
+            pos = (pos + w) % self.width # wrap around at the seam
+        return rects
+
+class TickerEffect(Effect):
+    # the frame is the scroll position: the tape starts at the right edge of
+    # the screen. the ticker is endless unless effects are cycled; then a
+    # scene ends when the whole tape has passed by.
+
+    name = "ticker"
+
+    @classmethod
+    def add_options(cls, parser):
+        parser.add_option("--tile-width", type="int", default=2048, action="store",
+                          dest="tile_width", help="width of the pre-rendered ticker tiles")
+        parser.add_option("--segment-width", type="int", default=1024, action="store",
+                          dest="segment_width", help="split longer lines into segments of about this width (0 = never)")
+        parser.add_option("--max-tiles", type="int", default=3, action="store",
+                          dest="max_tiles", help="max. number of pre-rendered ticker tiles to keep (at least 3, a frame can show that many)")
+
+    def __init__(self, engine):
+        Effect.__init__(self, engine)
+        self.frame = None # the frame drawn last
+
+    def follows(self, tape):
+        # whether tape is of a change of the text running by
+        return tape.change is not None and self.state is not None and tape.change.old is self.state.text
+
+    def prepare(self, text_model, change=None):
+        tape = Tape(text_model, self.assets, self.options, change)
+        if tape.width > 0:
+            tape.tile(0, pool=True) # pre-render what is shown first
+            if self.follows(tape) and self.frame is not None:
+                # or where update() will go on
+                pos = tape.follow(self.state, self.frame - self.options.width)
+                tape.tile(max(0, pos) % tape.width // tape.tile_width, pool=True)
+        return tape
+
+    def begin(self, state, changed, position=None):
+        self.state = state
+        if self.engine.cycling:
+            self.frames_max = state.width + self.options.width
+        return 0
+
+    def update(self, state, frame):
+        if not self.follows(state):
+            return None
+        # the line at the left edge of the screen stays there
+        pos = state.follow(self.state, frame - self.options.width)
+        state.adopt(self.state)
+        self.begin(state, True)
+        return pos + self.options.width
+
+    def render(self, frame, target):
+        y = self.options.y_pos
+        if y == None:
+            y = int((self.options.height - self.options.font_size) / 2)
+        self.frame = frame
+        return self.state.draw(target, frame - self.options.width, y)
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+
+# the main loop shared by all scrollers: screen setup, options, timing,
+# fonts, text (re-)loading and presentation. what is drawn is up to the
+# effects (see scrollkit.effects), one process can cycle through several.
+# several processes can show one scene together as a wall (see scrollkit.wall).
+
+import sys, os, optparse, re
+import pygame
+
+from scrollkit import bench, control, export, glyphs, metrics, pacing, prerender, present, textdiff, wall
+from scrollkit.assets import Assets
+from scrollkit.effects import EFFECTS
+from scrollkit.watch import TextLoader
+
+class Engine(object):
+
+    def __init__(self, options):
+        self.options = options
+        self.benchmark = None
+        if options.headless:
+            self.benchmark = bench.Benchmark(options.frames, options.hash_frames)
+        if options.export:
+            os.environ["SDL_VIDEODRIVER"] = "dummy" # offscreen
+
+        self.init_screen()
+        self.target = self.screen # what the effects draw onto
+        if options.canvas:
+            self.target = wall.Viewport(self.screen, options.viewport, (options.width, options.height))
+
+        # wall workers draw whenever a tick arrives, the coordinator keeps the time
+        self.pacer = pacing.Pacer(options, fixed=options.headless or bool(options.wall_listen) or bool(options.export))
+        self.presenter = present.Presenter(self.screen, options)
+        self.assets = Assets(options.basedir + "C64_Pro_Mono_v1.0-STYLE.ttf", options.render_cache_size,
+                             options.metrics_cache_size, options.prerender_workers, options.prerender_min_batch,
+                             options.glyph_cache, options.text_renderer)
+        self.effects = [EFFECTS[name](self) for name in options.effects]
+        self.effect_names = [effect.name for effect in self.effects]
+        self.cycling = len(self.effects) > 1 or bool(options.export) # every effect has scenes of limited length
+        self.text_model = None # the text prepared last, for the next reload to diff against
+        self.loader = TextLoader(options.text_file, self.prepare, options.reload_interval, options.use_inotify)
+        self.control = None
+        if options.control_port is not None:
+            self.control = control.ControlServer(self.loader, options.control_port)
+
+        self.metrics = metrics.Metrics(options, self.pacer)
+        self.overlay = metrics.Overlay(self.metrics, self.assets, options.overlay)
+        self.stats_outputs = []
+        if options.stats_port is not None:
+            self.stats_outputs.append(metrics.StatsServer(self.metrics, options.stats_port))
+        if options.stats_file:
+            self.stats_outputs.append(metrics.StatsWriter(self.metrics, options.stats_file, options.stats_interval))
+
+        self.coordinator = None
+        self.worker = None
+        if options.wall_send:
+            self.coordinator = wall.Coordinator(options.wall_send)
+        if options.wall_listen:
+            self.worker = wall.Worker(options.wall_listen)
+
+        self.exporter = None
+        if options.export:
+            self.exporter = export.Exporter(options, self.screen.get_size())
+
+    def init_screen(self):
+        options = self.options
+        # only what we use: no audio, joysticks and the like
+        pygame.display.init()
+        pygame.font.init()
+
+        opts = 0
+        if options.fullscreen:
+            opts |= pygame.FULLSCREEN
+
+        if options.hwsurface:
+            opts |= pygame.DOUBLEBUF | pygame.HWSURFACE
+
+        if options.fullscreen:
+            self.screen = self.set_mode((0, 0), opts)
+            (options.width, options.height) = self.screen.get_size()
+        else:
+            self.screen = self.set_mode(options.screen_resolution or (options.width, options.height), opts)
+            self.screen.fill(options.debug_color)
+            self.screen.set_clip((0, 0), (options.width, options.height))
+
+        pygame.display.set_caption(options.caption)
+        pygame.mouse.set_visible(0)
+        pygame.key.set_repeat(1, options.fps)
+
+    def set_mode(self, size, opts):
+        if self.options.vsync:
+            # SDL only synchronizes with the display for renderer based windows
+            try:
+                return pygame.display.set_mode(size, opts | pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                sys.stderr.write("vsync is not available (%s), using timers\n" % e)
+                self.options.vsync = False
+        return pygame.display.set_mode(size, opts)
+
+    def prepare(self, text_model):
+        # runs on the loader thread: every effect prepares its own state. the
+        # rendered lines are keyed by their text, so the unchanged ones stay cached
+        change = None
+        if self.text_model is not None:
+            change = textdiff.TextChange(self.text_model, text_model)
+        states = dict((effect.name, effect.prepare(text_model, change)) for effect in self.effects)
+        self.assets.store_atlases() # the ones built or grown meanwhile
+        self.text_model = text_model # only once prepared, a failed text is not diffed against
+        return states
+
+    def run(self):
+        options = self.options
+        states = self.loader.start()
+        fresh = set(states.keys()) # effects that did not see the current text yet
+
+        effect_index = 0
+        scenes = 0
+        scene_serial = 0 # counts the scenes shown, for the wall
+        frame = None # no scene running
+
+        export_scenes = options.export_scenes
+        if export_scenes is None:
+            # a complete cycle: until every effect showed all of its scenes
+            rounds = max(-(-effect.cycle_scenes(states[effect.name]) // options.scenes_per_effect) for effect in self.effects)
+            export_scenes = rounds * options.scenes_per_effect * len(self.effects)
+        frames_rendered = 0
+        running = True
+        redraw = False # e.g. the overlay was hidden or shown, redraw everything
+
+        for output in self.stats_outputs:
+            output.start()
+        if self.control:
+            self.control.start()
+        profiler = None
+        if options.profile:
+            profiler = metrics.Profiler(options.profile, options.profile_output)
+
+        if self.benchmark:
+            self.benchmark.start()
+        self.pacer.start()
+
+        # main loop
+        while running:
+            self.metrics.start_frame()
+
+            # handle events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:  # quit
+                    running = False
+
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        pygame.event.post(pygame.event.Event(pygame.QUIT))
+                    elif event.key == pygame.K_F3:
+                        self.overlay.toggle()
+                        redraw = True
+
+            self.metrics.lap("events")
+            effect = self.effects[effect_index]
+
+            # new texts are shown from the next scene on. effects that can
+            # switch right away go on showing the same part of the text,
+            # other endless effects start over
+            new_states = self.loader.poll()
+            if new_states is not None:
+                states = new_states
+                fresh = set(states.keys())
+                if frame is not None:
+                    updated = effect.update(states[effect.name], frame)
+                    if updated is not None:
+                        frame = updated
+                        fresh.discard(effect.name)
+                        redraw = True
+                    elif effect.frames_max is None:
+                        frame = None
+            self.metrics.lap("reload")
+
+            if self.worker:
+                # the coordinator runs the timeline, we show the frame of its newest tick
+                tick = self.worker.receive(1.0 / options.fps)
+                self.metrics.lap("sleep")
+                if tick is None or tick["effect"] not in self.effect_names:
+                    self.metrics.end_frame()
+                    continue
+                new_scene = tick["scene"] != scene_serial or frame is None
+                if new_scene:
+                    if frame is not None:
+                        effect.end()
+                    scene_serial = tick["scene"]
+                    effect_index = self.effect_names.index(tick["effect"])
+                    effect = self.effects[effect_index]
+                    effect.begin(states[effect.name], effect.name in fresh, tick["position"])
+                    fresh.discard(effect.name)
+                frame = tick["frame"]
+            else:
+                new_scene = frame is None
+                if new_scene:
+                    frame = effect.begin(states[effect.name], effect.name in fresh)
+                    fresh.discard(effect.name)
+                    if options.debug_start_frame != None:
+                        frame = options.debug_start_frame
+                    scene_serial += 1
+                if self.coordinator:
+                    self.coordinator.send(scene_serial, effect.name, effect.position(), frame)
+
+            # draw scene
+            self.presenter.clear(full=new_scene or redraw)
+            redraw = False
+            rects = effect.render(frame, self.target)
+            overlay_rects = self.overlay.draw(self.screen)
+            if rects is not None:
+                rects = rects + overlay_rects
+            self.metrics.lap("render")
+
+            if self.exporter and not self.exporter.add(self.screen):
+                running = False # writing failed, close() tells why
+
+            # show screen and try to keep at the target FPS
+            self.presenter.present(rects)
+            frames_rendered += 1
+            self.metrics.lap("present")
+
+            if self.benchmark:
+                running = self.benchmark.frame_done(self.screen, frame, effect.frames_max) and running
+            if profiler and not profiler.frame_done():
+                profiler = None
+            advance = self.pacer.wait()
+            self.metrics.lap("sleep")
+            self.metrics.end_frame()
+
+            if options.show_fps and frames_rendered % max(1, options.fps // 3) == 0:
+                sys.stdout.write("%8.4f fps %6d skipped\r" % (self.pacer.get_fps(), self.pacer.skipped))
+                sys.stdout.flush()
+
+            if self.worker:
+                continue # the next tick tells what comes next
+
+            # go to next frame (or further, if we fell behind)
+            frame += options.speed * advance
+
+            if (options.debug_end_frame != None) and (frame >= options.debug_end_frame):
+                frame = None # end the scene early
+            elif (effect.frames_max is not None) and (frame >= effect.frames_max):
+                frame = None
+
+            if frame is None:
+                effect.end()
+                scenes += 1
+                if self.exporter and scene_serial >= export_scenes:
+                    running = False
+                if scenes >= options.scenes_per_effect:
+                    effect_index = (effect_index + 1) % len(self.effects)
+                    scenes = 0
+
+        if self.control:
+            self.control.close()
+        self.loader.close()
+        self.assets.close()
+        if self.exporter:
+            self.exporter.close()
+        for connection in (self.coordinator, self.worker):
+            if connection:
+                connection.close()
+        for output in self.stats_outputs:
+            output.close()
+        if profiler:
+            profiler.frame_done(force=True)
+
+        if self.benchmark:
+            self.benchmark.write(options.bench_json)
+        if self.exporter and self.exporter.error:
+            sys.exit(1)
+
+def make_parser(defaults):
+    parser = optparse.OptionParser()
+    parser.add_option("-f", "--full-screen", default=False, action="store_true",
+                      dest="fullscreen", help="toogle fullscreen mode")
+
+    parser.add_option("--hw-surface", action="store_true",
+                      dest="hwsurface", help="use hardware acceleration for pygame surfaces")
+
+    parser.add_option("-g", "--geometry", type="string", default="800x600", action="store",
+                      dest="geometry", help="screen size in [width]x[height]")
+
+    parser.add_option("-y", "--y-pos", type="int", default=None, action="store",
+                      dest="y_pos", help="y position")
+
+    parser.add_option("--fps", type="int", default=30, action="store",
+                      dest="fps", help="frames per second")
+
+    parser.add_option("-s", "--speed", type="int", default=3, action="store",
+                      dest="speed", help="scroll speed in pixels per frame")
+
+    parser.add_option("--font-size", type="int", default=44, action="store",
+                      dest="font_size", help="font size")
+
+    parser.add_option("--font-size-factor", type="float", default=0.7, action="store",
+                      dest="font_size_factor", help="ratio between font sizes of row 1 and 2")
+
+    parser.add_option("--render-cache-size", type="int", default=256, action="store",
+                      dest="render_cache_size", help="max. number of pre-rendered lines to keep (0 = unlimited)")
+
+    parser.add_option("--metrics-cache-size", type="int", default=65536, action="store",
+                      dest="metrics_cache_size", help="max. number of measured lines to keep (0 = unlimited)")
+
+    parser.add_option("-t", "--text-file", type="string", default="ocm-scores.txt", action="store",
+                      dest="text_file", help="text filename")
+
+    parser.add_option("--reload-interval", type="float", default=1.0, action="store",
+                      dest="reload_interval", help="seconds between checks for changes of the text file")
+
+    parser.add_option("--no-inotify", default=True, action="store_false",
+                      dest="use_inotify", help="only poll for changes of the text file")
+
+    parser.add_option("--effects", type="string", default="scene", action="store",
+                      dest="effects", help="comma separated list of effects to cycle through (%s)" % ", ".join(sorted(EFFECTS.keys())))
+
+    parser.add_option("--scenes-per-effect", type="int", default=1, action="store",
+                      dest="scenes_per_effect", help="number of scenes to show before switching to the next effect")
+
+    parser.add_option("--debug-start-frame", type="int", default=None, action="store",
+                      dest="debug_start_frame", help="debug start frame")
+
+    parser.add_option("--debug-end-frame", type="int", default=None, action="store",
+                      dest="debug_end_frame", help="debug end frame")
+
+    for name in sorted(EFFECTS.keys()):
+        EFFECTS[name].add_options(parser)
+
+    pacing.add_options(parser)
+    present.add_options(parser)
+    metrics.add_options(parser)
+    control.add_options(parser)
+    glyphs.add_options(parser)
+    prerender.add_options(parser)
+    export.add_options(parser)
+    wall.add_options(parser)
+    bench.add_options(parser)
+
+    parser.set_defaults(caption="Scores", screen_resolution=None)
+    parser.set_defaults(**defaults)
+    return parser
+
+def main(**defaults):
+    # runs the scroller, defaults override the options' defaults
+    options_error = False
+    parser = make_parser(defaults)
+    (options, args) = parser.parse_args()
+
+    options.text_color = (0xff, 0xff, 0xff)
+    options.bg_color = (0x00, 0x00, 0x00)
+    options.debug_color = (0xc0, 0x00, 0x00)
+    options.separator = u' ••• '
+
+    match = re.search("^(\d+)x(\d+)$", options.geometry) # split geometry string
+    if match:
+        options.width = int(match.group(1))
+        options.height = int(match.group(2))
+    else:
+        options_error = True
+
+    if options.canvas:
+        # the screen shows a part of a wall: the effects lay out the whole canvas
+        match = re.search("^(\d+)x(\d+)$", options.canvas)
+        viewport = re.search("^(-?\d+),(-?\d+)$", options.viewport)
+        if match and viewport:
+            options.screen_resolution = (options.width, options.height)
+            options.width = int(match.group(1))
+            options.height = int(match.group(2))
+            options.viewport = (int(viewport.group(1)), int(viewport.group(2)))
+        else:
+            options_error = True
+
+    if options.export:
+        options.text_start_random = False # the same video every time
+        if options.export_output is None:
+            options.export_output = "frame-%06d.png" if options.export == "png" else "-"
+        if options.export == "y4m" and export.numpy is None:
+            parser.error("--export=y4m needs numpy")
+        if options.wall_listen:
+            parser.error("wall workers cannot export")
+
+    if options.wall_send and options.wall_listen:
+        parser.error("a wall process either coordinates (--wall-send) or listens (--wall-listen)")
+
+    if options.hash_frames is not None and bench.hash_schedule(options.hash_frames) is None:
+        options_error = True
+
+    options.effects = options.effects.split(",")
+    if [name for name in options.effects if name not in EFFECTS]:
+        options_error = True
+
+    if "crawl" in options.effects and options.crawl_engine == "fast" \
+       and not EFFECTS["crawl"].fast_engine_available():
+        parser.error("--crawl-engine=fast needs numpy")
+
+    if "ticker" in options.effects and options.max_tiles < 3:
+        parser.error("--max-tiles must be at least 3")
+
+    if "scene" in options.effects and options.scene_engine == "surfarray" \
+       and not EFFECTS["scene"].surfarray_engine_available():
+        parser.error("--scene-engine=surfarray needs numpy")
+
+    options.font_size2 = int(round(options.font_size * options.font_size_factor))
+    options.basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/"
+
+    if options_error:
+        parser.print_usage()
+    else:
+        Engine(options).run()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# exporting the scrollers as video.
+#
+# in export mode a complete cycle is rendered offscreen, one frame after the
+# other without waiting for the frame clock. the main loop only copies each
+# frame's pixels; converting and writing them is done by a writer thread,
+# which takes all frames queued up so far in one go.
+#
+# formats: y4m (YUV 4:4:4, needs numpy) or raw rgb24 frames, both to a file
+# or to stdout for a local ffmpeg, and PNG sequences.
+#
+#   ./ocm-scroller.py --export y4m | ffmpeg -i - scores.mp4
+#   ./scoroller.py --export raw | ffmpeg -f rawvideo -pix_fmt rgb24 -s 320x240 -r 100 -i - ticker.mp4
+
+import queue, sys, threading
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FORMATS = ("y4m", "raw", "png")
+
+class Exporter(object):
+
+    def __init__(self, options, size):
+        self.options = options
+        self.format = options.export
+        self.size = size
+        self.frames = queue.Queue(options.export_queue)
+        self.count = 0 # frames written
+        self.error = None
+
+        self.output = None
+        self.to_stdout = options.export_output == "-"
+        if self.format != "png":
+            if self.to_stdout:
+                self.output = sys.stdout.buffer
+                sys.stdout = sys.stderr # anything printed would end up in the video
+            else:
+                self.output = open(options.export_output, "wb")
+            if self.format == "y4m":
+                self.output.write(("YUV4MPEG2 W%d H%d F%d:1 Ip A1:1 C444\n" % (size[0], size[1], options.fps)).encode("ascii"))
+
+        self.thread = threading.Thread(target=self.run, name="exporter")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, screen):
+        # queues the screen's pixels as the next frame (blocks if the writer is
+        # too far behind). returns False once writing failed
+        if self.error:
+            return False
+        self.frames.put(pygame.image.tostring(screen, "RGB"))
+        return True
+
+    def run(self):
+        # after an error the frames are still taken (and dropped), so add()
+        # and close() never wait for a writer that is gone
+        done = False
+        while not done:
+            batch = [self.frames.get()]
+            while True:
+                try:
+                    batch.append(self.frames.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None: # close() was called
+                batch.pop()
+                done = True
+            if self.error:
+                continue
+            try:
+                self.write(batch)
+            except Exception as e:
+                self.error = e
+
+    def write(self, batch):
+        if self.format == "png":
+            for pixels in batch:
+                surface = pygame.image.frombuffer(pixels, self.size, "RGB")
+                pygame.image.save(surface, self.options.export_output % self.count)
+                self.count += 1
+            return
+        if self.format == "y4m":
+            batch = [b"FRAME\n" + self.yuv444(pixels) for pixels in batch]
+        self.output.write(b"".join(batch))
+        self.count += len(batch)
+
+    def yuv444(self, pixels):
+        # BT.601, limited range: the planes Y, Cb and Cr one after another
+        rgb = numpy.frombuffer(pixels, numpy.uint8).reshape(-1, 3).astype(numpy.float32)
+        yuv = rgb.dot(numpy.array([[ 65.481, -37.797, 112.0  ],
+                                   [128.553, -74.203, -93.786],
+                                   [ 24.966, 112.0  , -18.214]], numpy.float32) / 255.0)
+        yuv += numpy.array([16.0, 128.0, 128.0], numpy.float32)
+        return numpy.round(yuv).astype(numpy.uint8).T.tobytes()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.frames.put(None)
+            self.thread.join()
+        if self.output is not None:
+            try:
+                self.output.flush()
+                if not self.to_stdout:
+                    self.output.close()
+            except (IOError, OSError) as e:
+                self.error = self.error or e
+        if self.error:
+            sys.stderr.write("export failed: %s\n" % self.error)
+        else:
+            sys.stderr.write("exported %d frames\n" % self.count)
+
+def add_options(parser):
+    parser.add_option("--export", type="choice", choices=FORMATS, default=None, action="store",
+                      dest="export", help="render one complete cycle offscreen as video: y4m, raw (rgb24) or png")
+
+    parser.add_option("--export-output", type="string", default=None, action="store",
+                      dest="export_output", help="file to export to, - for stdout (default), or the file name pattern of a png sequence (frame-%06d.png)")
+
+    parser.add_option("--export-scenes", type="int", default=None, action="store",
+                      dest="export_scenes", help="number of scenes to export instead of a complete cycle")
+
+    parser.add_option("--export-queue", type="int", default=64, action="store",
+                      dest="export_queue", help="max. number of frames waiting for the writer thread")
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# glyph atlases: the characters of the (monospaced) font rendered once per
+# size and color, side by side in cells of the font's advance width. as the
+# glyphs do not reach beyond their cells, a line of text looks exactly like
+# the cells of its characters put in a row (which is checked when building
+# an atlas).
+#
+# atlases are kept on disk between runs, keyed by a hash of the font data
+# and the versions of pygame and SDL_ttf (which rasterize it), the size and
+# the color, so a restart does not rasterize them again. new
+# and grown atlases are written on the loader thread or at exit, never
+# while drawing a frame.
+#
+# with --text-renderer=atlas, lines are composed from the atlas instead of
+# rendering them: one numpy gather of the cells' columns (or one blit per
+# character without numpy). characters without a cell get one if they fit
+# in it, anything else is left to font.render().
+
+import hashlib, json, os, sys
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from scrollkit.prerender import BGRA_MASKS
+
+RENDERERS = ("ttf", "atlas")
+
+# what an atlas holds: latin-1 plus some punctuation scores are written with
+CHARSET = "".join(chr(c) for c in range(32, 127)) + "".join(chr(c) for c in range(160, 256)) \
+          + u"–—‘’“”•…€"
+
+def default_directory():
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "scoroller")
+
+class GlyphAtlas(object):
+    # surface: the cells, in the pixel format of font.render()'s surfaces.
+    # lines are as high as the font, one row more with a descender like g or
+    # y in them. the atlas has that extra row, only the tall cells use it
+
+    FORMAT = 2 # of the saved atlases
+
+    def __init__(self, surface, chars, advance, color, base_height, tall):
+        self.surface = surface
+        self.chars = chars
+        self.advance = advance
+        self.color = tuple(color[:3])
+        self.height = surface.get_height()
+        self.base_height = base_height
+        self.tall = tall # the characters that need all of height
+        self.cells = dict((c, i) for (i, c) in enumerate(chars))
+        self.pixels = None # [row, cell, bytes of the cell's row], for composing with numpy
+
+    @classmethod
+    def build(cls, font, color):
+        # renders the charset. characters of another width are left out, and
+        # so is everything if the font turns out to draw lines differently
+        advance = font.size(" ")[0]
+        glyphs = [(c, font.render(c, 1, color)) for c in CHARSET if font.size(c)[0] == advance]
+        base_height = font.render(" ", 1, color).get_height()
+        height = max([base_height] + [glyph.get_height() for (c, glyph) in glyphs])
+        surface = cls.blank(advance * len(glyphs), height, color)
+        for (i, (c, glyph)) in enumerate(glyphs):
+            surface.blit(glyph, (i * advance, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        chars = "".join(c for (c, glyph) in glyphs)
+        tall = "".join(c for (c, glyph) in glyphs if glyph.get_height() > base_height)
+        atlas = cls(surface, chars, advance, color, base_height, tall)
+        for sample in (chars, "".join(c for c in chars if c not in tall)):
+            if not atlas.draws_like(font, sample):
+                return cls(surface, "", advance, color, base_height, "")
+        return atlas
+
+    def draws_like(self, font, text):
+        if not text:
+            return True
+        (reference, composed) = (font.render(text, 1, self.color), self.compose(text))
+        return reference.get_size() == composed.get_size() \
+               and pygame.image.tostring(reference, "RGBA") == pygame.image.tostring(composed, "RGBA")
+
+    @staticmethod
+    def blank(width, height, color):
+        # what cells are blitted onto (with BLEND_RGBA_MAX, which copies them)
+        surface = pygame.Surface((max(1, width), height), pygame.SRCALPHA, 32)
+        surface.fill(tuple(color[:3]) + (0,)) # font.render() leaves the color in transparent pixels, too
+        return surface
+
+    def add(self, font, c):
+        # gives character c a cell if its glyph fits in one, returns whether it does
+        if not self.chars or font.size(c)[0] != self.advance:
+            return False # no atlas for this font, or a glyph of another width
+        metrics = font.metrics(c)[0]
+        if metrics is None or metrics[0] < 0 or metrics[1] > self.advance:
+            return False
+        glyph = font.render(c, 1, self.color)
+        if glyph.get_width() != self.advance or glyph.get_height() not in (self.base_height, self.height):
+            return False
+        surface = self.blank(self.advance * (len(self.chars) + 1), self.height, self.color)
+        surface.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        surface.blit(glyph, (self.advance * len(self.chars), 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.surface = surface
+        self.cells[c] = len(self.chars)
+        self.chars += c
+        if glyph.get_height() > self.base_height:
+            self.tall += c
+        self.pixels = None
+        return True
+
+    def compose(self, text):
+        # text put together from the cells, exactly as font.render() draws it.
+        # None if one of its characters has no cell
+        cells = [self.cells.get(c) for c in text]
+        if not cells or None in cells:
+            return None
+        width = self.advance * len(cells)
+        height = self.height if [c for c in self.tall if c in text] else self.base_height
+        if numpy is not None and self.surface.get_masks() == BGRA_MASKS and sys.byteorder == "little":
+            if self.pixels is None:
+                rows = numpy.frombuffer(self.surface.get_buffer(), numpy.uint8).reshape(self.height, self.surface.get_pitch())
+                self.pixels = rows[:, :len(self.chars) * self.advance * 4].reshape(self.height, len(self.chars), self.advance * 4).copy()
+                del rows
+            return pygame.image.frombuffer(self.pixels[:height].take(cells, axis=1), (width, height), "BGRA")
+        surface = self.blank(width, height, self.color)
+        for (i, cell) in enumerate(cells):
+            surface.blit(self.surface, (i * self.advance, 0), (cell * self.advance, 0, self.advance, height),
+                         special_flags=pygame.BLEND_RGBA_MAX)
+        return surface
+
+    @classmethod
+    def load(cls, filename, color):
+        # a header line of JSON, then the pixels
+        f = open(filename, "rb")
+        try:
+            header = json.loads(f.readline().decode("utf-8"))
+            pixels = f.read()
+        finally:
+            f.close()
+        if header.get("format") != cls.FORMAT:
+            raise ValueError("glyph atlas of another format")
+        surface = pygame.image.fromstring(pixels, tuple(header["size"]), "BGRA")
+        return cls(surface, header["chars"], header["advance"], color, header["base_height"], header["tall"])
+
+    def dump(self):
+        # the atlas as saved: a header line of JSON, then the pixels
+        header = { "format": self.FORMAT, "size": self.surface.get_size(), "chars": self.chars,
+                   "advance": self.advance, "base_height": self.base_height, "tall": self.tall }
+        return (json.dumps(header) + "\n").encode("utf-8") + pygame.image.tostring(self.surface, "BGRA")
+
+def write_file(filename, data):
+    tmp = "%s.%d.tmp" % (filename, os.getpid())
+    f = open(tmp, "wb")
+    try:
+        f.write(data)
+    finally:
+        f.close()
+    os.replace(tmp, filename) # readers never see half an atlas
+
+class AtlasCache(object):
+    # the atlases of one font, in memory and in directory (None: in memory only).
+    # not thread-safe, Assets calls us under its lock. new and grown atlases
+    # are only written by store()
+
+    def __init__(self, font_data, directory):
+        versions = "pygame %s, SDL_ttf %d.%d.%d" % ((pygame.version.ver,) + pygame.font.get_sdl_ttf_version())
+        self.key = hashlib.sha1(font_data + versions.encode("ascii")).hexdigest()[:16]
+        self.directory = directory
+        self.atlases = {}
+        self.unsaved = set() # (size, color) of the atlases store() has to write
+
+    def filename(self, size, color):
+        return os.path.join(self.directory, "%s-%d-%s.atlas" % (self.key, size, "".join("%02x" % c for c in color)))
+
+    def get(self, font, size, color):
+        color = tuple(color)
+        atlas = self.atlases.get((size, color))
+        if atlas is not None:
+            return atlas
+        if self.directory:
+            try:
+                atlas = GlyphAtlas.load(self.filename(size, color), color)
+            except (IOError, OSError, ValueError, KeyError, pygame.error):
+                atlas = None # not there yet (or broken), build it again
+        if atlas is None:
+            atlas = GlyphAtlas.build(font, color)
+            self.unsaved.add((size, color))
+        self.atlases[(size, color)] = atlas
+        return atlas
+
+    def add(self, font, size, color, c):
+        # see GlyphAtlas.add(), keeps the grown atlas
+        atlas = self.get(font, size, color)
+        if not atlas.add(font, c):
+            return False
+        self.unsaved.add((size, tuple(color)))
+        return True
+
+    def unsaved_files(self):
+        # the (filename, data) of the atlases to write, forgetting about them
+        files = []
+        if self.directory:
+            files = [(self.filename(size, color), self.atlases[(size, color)].dump()) for (size, color) in self.unsaved]
+        self.unsaved.clear()
+        return files
+
+    def store(self, files):
+        # writes unsaved_files(), which can be done without the lock
+        try:
+            if files and not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            for (filename, data) in files:
+                write_file(filename, data)
+        except (IOError, OSError) as e:
+            sys.stderr.write("cannot save glyph atlas: %s\n" % e)
+            self.directory = None # do not try again
+
+def add_options(parser):
+    parser.add_option("--text-renderer", type="choice", choices=RENDERERS, default="atlas", action="store",
+                      dest="text_renderer", help="how lines of text are drawn: ttf (font.render()) or atlas (composed from glyph atlases)")
+
+    parser.add_option("--glyph-cache", type="string", default=default_directory(), action="store",
+                      dest="glyph_cache", help="directory to keep glyph atlases in between runs (empty: do not keep them)")
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+# runtime metrics of the main loop.
+#
+# each frame is split into phases (events, reload, render, present, sleep),
+# whose durations are kept in rolling windows. together with the counters
+# of font rasterizations and surface allocations they can be fetched as JSON
+# from a small HTTP server on localhost, written to a stats file periodically
+# or shown in an on-screen overlay (toggled with F3).
+#
+# counting wraps pygame's functions process-wide (see scrollkit.bench), which
+# slows drawing down a little, so it is only done when the stats are shown
+# or written from the start. otherwise the counters are null.
+
+import collections, json, os, sys, threading, time
+import pygame
+
+from scrollkit import bench
+
+PHASES = ("events", "reload", "render", "present", "sleep")
+
+# upper bounds (in ms) of the histogram buckets
+BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+class RollingHistogram(object):
+    # the last window samples of a duration
+
+    def __init__(self, window):
+        self.samples = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def snapshot(self):
+        times = sorted(self.samples)
+        ms = lambda t: None if t is None else round(t * 1000.0, 4)
+        buckets = [0] * (len(BUCKETS) + 1)
+        i = 0
+        for t in times:
+            while i < len(BUCKETS) and t * 1000.0 > BUCKETS[i]:
+                i += 1
+            buckets[i] += 1
+        return {
+            "count": len(times),
+            "mean": ms(sum(times) / len(times)) if times else None,
+            "p50": ms(bench.percentile(times, 50)),
+            "p95": ms(bench.percentile(times, 95)),
+            "p99": ms(bench.percentile(times, 99)),
+            "max": ms(times[-1] if times else None),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["inf"], buckets)),
+        }
+
+class Metrics(object):
+
+    def __init__(self, options, pacer):
+        self.options = options
+        self.pacer = pacer
+        self.lock = threading.Lock()
+        window = max(1, int(options.fps * options.stats_window))
+        self.phases = dict((name, RollingHistogram(window)) for name in PHASES + ("frame",))
+        self.frames = 0
+        self.started = time.time()
+        self.laps = {}
+        self.frame_start = None
+        self.lap_start = None
+        if options.headless or options.stats_port is not None or options.stats_file or options.overlay:
+            bench.counters.install()
+
+    def start_frame(self):
+        self.frame_start = self.lap_start = time.perf_counter()
+        self.laps = {}
+
+    def lap(self, phase):
+        # the time since the previous lap (or the start of the frame) was spent in phase
+        now = time.perf_counter()
+        self.laps[phase] = self.laps.get(phase, 0.0) + now - self.lap_start
+        self.lap_start = now
+
+    def end_frame(self):
+        with self.lock:
+            for (phase, seconds) in self.laps.items():
+                self.phases[phase].add(seconds)
+            self.phases["frame"].add(self.lap_start - self.frame_start)
+            self.frames += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "frames": self.frames,
+                "fps": round(self.pacer.get_fps(), 3),
+                "skipped_frames": self.pacer.skipped,
+                "rasterizations": bench.counters.rasterizations if bench.counters.installed else None,
+                "allocations": bench.counters.allocations if bench.counters.installed else None,
+                "phases_ms": dict((name, histogram.snapshot()) for (name, histogram) in self.phases.items()),
+            }
+
+class StatsServer(threading.Thread):
+    # serves the metrics as JSON on http://127.0.0.1:port/
+
+    def __init__(self, metrics, port):
+        threading.Thread.__init__(self, name="stats-server")
+        self.daemon = True
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = (json.dumps(metrics.snapshot(), indent=2, sort_keys=True) + "\n").encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", port), Handler)
+
+    def run(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.shutdown()
+
+class StatsWriter(threading.Thread):
+    # writes the metrics as JSON to a file every interval seconds
+
+    def __init__(self, metrics, filename, interval):
+        threading.Thread.__init__(self, name="stats-writer")
+        self.daemon = True
+        self.metrics = metrics
+        self.filename = filename
+        self.interval = interval
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        # replace the file atomically, so readers never see half of it
+        try:
+            f = open(self.filename + ".tmp", "w")
+            f.write(json.dumps(self.metrics.snapshot(), indent=2, sort_keys=True) + "\n")
+            f.close()
+            os.replace(self.filename + ".tmp", self.filename)
+        except (IOError, OSError) as e:
+            sys.stderr.write("cannot write %s: %s\n" % (self.filename, e))
+
+    def close(self):
+        self.stop.set()
+        self.write()
+
+class Overlay(object):
+    # fps and phase times in the upper left corner, updated twice a second
+
+    def __init__(self, metrics, assets, visible):
+        self.metrics = metrics
+        self.assets = assets
+        self.visible = visible
+        self.font = None
+        self.surface = None
+        self.updated = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, target):
+        # returns the rects drawn to
+        if not self.visible:
+            return []
+        if self.surface is None or time.time() - self.updated >= 0.5:
+            if self.font is None:
+                self.font = pygame.font.Font(self.assets.font_file(), 12) # our own, for the render thread only
+            stats = self.metrics.snapshot()
+            lines = ["%6.1f fps  %d skipped" % (stats["fps"], stats["skipped_frames"])]
+            for name in PHASES + ("frame",):
+                phase = stats["phases_ms"][name]
+                if phase["count"]:
+                    lines.append("%-8s %7.3f %7.3f ms" % (name, phase["p50"], phase["p99"]))
+            if stats["rasterizations"] is not None:
+                lines.append("%d renders  %d surfaces" % (stats["rasterizations"], stats["allocations"]))
+            rendered = [self.font.render(line, 0, (0xff, 0xff, 0x00), (0x00, 0x00, 0x00)) for line in lines]
+            self.surface = pygame.Surface((max(r.get_width() for r in rendered),
+                                           sum(r.get_height() for r in rendered)))
+            y = 0
+            for r in rendered:
+                self.surface.blit(r, (0, y))
+                y += r.get_height()
+            self.updated = time.time()
+        return [target.blit(self.surface, (0, 0))]
+
+class Profiler(object):
+    # profiles the first frames frames with cProfile and dumps the stats
+
+    def __init__(self, frames, filename):
+        import cProfile
+        self.frames = frames
+        self.filename = filename
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def frame_done(self, force=False):
+        # returns False once profiling is done, force stops it early
+        self.frames -= 1
+        if self.frames > 0 and not force:
+            return True
+        import pstats
+        self.profile.disable()
+        self.profile.dump_stats(self.filename)
+        pstats.Stats(self.profile, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+        sys.stderr.write("profile written to %s\n" % self.filename)
+        return False
+
+def add_options(parser):
+    parser.add_option("--show-fps", default=False, action="store_true",
+                      dest="show_fps", help="report actual fps to stdout")
+
+    parser.add_option("--overlay", default=False, action="store_true",
+                      dest="overlay", help="show fps and frame times on screen (toggle with F3)")
+
+    parser.add_option("--stats-port", type="int", default=None, action="store",
+                      dest="stats_port", help="serve metrics as JSON on this port of localhost")
+
+    parser.add_option("--stats-file", type="string", default=None, action="store",
+                      dest="stats_file", help="write metrics as JSON to this file periodically")
+
+    parser.add_option("--stats-interval", type="float", default=5.0, action="store",
+                      dest="stats_interval", help="seconds between writes of the stats file")
+
+    parser.add_option("--stats-window", type="float", default=10.0, action="store",
+                      dest="stats_window", help="seconds of frames the frame time statistics cover")
+
+    parser.add_option("--profile", type="int", default=None, action="store",
+                      dest="profile", help="profile this many frames with cProfile")
+
+    parser.add_option("--profile-output", type="string", default="scroller.prof", action="store",
+                      dest="profile_output", help="file to dump the profile stats to")
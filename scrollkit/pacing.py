@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# frame pacing.
+#
+# the scroll position advances with the time that passed, not with the number
+# of frames drawn: if drawing falls behind the target fps, frames are skipped
+# (up to max_frame_skip in a row) instead of slowing the scroll down. waiting
+# for the next frame sleeps first and spins for the last few milliseconds,
+# which is cheap on the CPU but still precise.
+
+import time
+import pygame
+
+class Pacer(object):
+
+    def __init__(self, options, fixed=False):
+        self.options = options
+        self.fixed = fixed # one frame per call, no waiting (i.e. headless)
+        self.period = 1.0 / options.fps
+        self.clock = pygame.time.Clock() # for measuring the actual fps only
+        self.start_time = None
+        self.ticks = 0 # frames since start_time
+        self.skipped = 0
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.ticks = 0
+
+    def sleep_until(self, due):
+        remaining = due - time.monotonic()
+        spin = self.options.spin_ms / 1000.0
+        if self.options.use_busy_loop:
+            spin = remaining
+        if remaining > spin:
+            time.sleep(remaining - spin)
+        while time.monotonic() < due:
+            pass
+
+    def wait(self):
+        # waits until the next frame is due, returns by how many frames to advance
+        self.clock.tick()
+        if self.fixed:
+            return 1
+
+        if self.options.pacing == "frame":
+            # the old way: one frame per frame drawn, however long that took
+            due = self.start_time + (self.ticks + 1) * self.period
+            self.sleep_until(due)
+            if time.monotonic() - due > self.period:
+                self.start_time = time.monotonic() - (self.ticks + 1) * self.period # don't catch up
+            self.ticks += 1
+            return 1
+
+        if not self.options.vsync: # else flipping the screen already waited for the display
+            self.sleep_until(self.start_time + (self.ticks + 1) * self.period)
+
+        advance = int((time.monotonic() - self.start_time) / self.period) - self.ticks
+        if advance > self.options.max_frame_skip + 1:
+            # too far behind (i.e. the process was suspended): give up catching up
+            self.start_time += (advance - self.options.max_frame_skip - 1) * self.period
+            advance = self.options.max_frame_skip + 1
+        self.ticks += advance
+        self.skipped += max(0, advance - 1)
+        return advance
+
+    def get_fps(self):
+        return self.clock.get_fps()
+
+def add_options(parser):
+    parser.add_option("--pacing", type="choice", choices=["time", "frame"], default="time", action="store",
+                      dest="pacing", help="advance the scroll by elapsed time (skipping frames if needed) or by frames drawn")
+
+    parser.add_option("--max-frame-skip", type="int", default=4, action="store",
+                      dest="max_frame_skip", help="max. number of frames to skip in a row when drawing falls behind")
+
+    parser.add_option("--spin-ms", type="float", default=2.0, action="store",
+                      dest="spin_ms", help="milliseconds to busy-wait (instead of sleeping) before each frame")
+
+    parser.add_option("--use-busy-loop", default=False, action="store_true",
+                      dest="use_busy_loop", help="busy-wait for the next frame instead of sleeping")
+
+    parser.add_option("--vsync", default=False, action="store_true",
+                      dest="vsync", help="synchronize screen updates with the display's refresh")
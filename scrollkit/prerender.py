@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# rasterizing text in parallel, in a pool of worker processes.
+#
+# each worker renders its share of a batch of lines with its own fonts and
+# writes the pixels into one shared memory segment. the main process wraps
+# the pixels with pygame.image.frombuffer, so the surfaces use the segment's
+# memory directly. a segment is unlinked right away (nothing leaks if we
+# crash) and closed once none of its surfaces is left.
+
+import multiprocessing, os, sys, threading
+from multiprocessing import shared_memory
+
+fonts = {} # per worker process: (font_filename, size) -> font
+
+# the pixel layout of rendered text, as pygame.image.frombuffer names it
+BGRA_MASKS = (0xff0000, 0xff00, 0xff, 0xff000000)
+
+def rasterize(args):
+    # runs in a worker: renders (text, size, color) requests into one shared
+    # memory segment, returns its name and (offset, width, height, format) per request
+    (font_filename, requests) = args
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    if not pygame.font.get_init():
+        pygame.font.init()
+    surfaces = []
+    for (text, size, color) in requests:
+        font = fonts.get((font_filename, size))
+        if font is None:
+            font = fonts[(font_filename, size)] = pygame.font.Font(font_filename, size)
+        surfaces.append(font.render(text, 1, color))
+
+    segment = shared_memory.SharedMemory(create=True, size=max(1, sum(s.get_width() * s.get_height() * 4 for s in surfaces)))
+    layout = []
+    offset = 0
+    for surface in surfaces:
+        (width, height) = surface.get_size()
+        row = width * 4
+        if surface.get_masks() == BGRA_MASKS and sys.byteorder == "little":
+            # copy the rows as they are, just without the padding at their ends
+            pixels = memoryview(surface.get_buffer())
+            pitch = surface.get_pitch()
+            for y in range(height):
+                segment.buf[offset + y * row:offset + (y + 1) * row] = pixels[y * pitch:y * pitch + row]
+            del pixels
+            layout.append((offset, width, height, "BGRA"))
+        else:
+            segment.buf[offset:offset + row * height] = pygame.image.tostring(surface, "RGBA")
+            layout.append((offset, width, height, "RGBA"))
+        offset += row * height
+    name = segment.name
+    segment.close()
+    return (name, layout)
+
+class Prerenderer(object):
+    # the pool is started with the first batch large enough for it
+
+    def __init__(self, font_filename, workers, min_batch):
+        self.font_filename = font_filename
+        self.workers = workers
+        self.min_batch = min_batch
+        self.pool = None
+        self.segments = [] # attached segments, some of their surfaces may still be alive
+        self.lock = threading.Lock()
+
+    def release(self):
+        # closes the segments none of whose surfaces are alive anymore
+        with self.lock:
+            alive = []
+            for segment in self.segments:
+                try:
+                    segment.close()
+                except BufferError:
+                    alive.append(segment)
+            self.segments = alive
+
+    def render(self, requests):
+        # returns the surfaces for (text, size, color) requests, or None if
+        # the batch is too small to be worth the round trip to the pool
+        if self.workers < 1 or len(requests) < max(1, self.min_batch):
+            return None
+        import pygame
+        with self.lock:
+            if self.pool is None:
+                # fresh interpreters, a forked copy of SDL's state is no good
+                self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+            pool = self.pool
+        self.release()
+
+        # every worker gets every n-th line, so long and short lines mix
+        n = min(self.workers, len(requests))
+        chunks = [requests[i::n] for i in range(n)]
+        surfaces = [None] * len(requests)
+        for (i, (name, layout)) in enumerate(pool.map(rasterize, [(self.font_filename, chunk) for chunk in chunks])):
+            segment = shared_memory.SharedMemory(name=name)
+            segment.unlink()
+            for (j, (offset, width, height, format)) in enumerate(layout):
+                pixels = segment.buf[offset:offset + width * height * 4]
+                surfaces[i + j * n] = pygame.image.frombuffer(pixels, (width, height), format)
+            with self.lock:
+                self.segments.append(segment)
+        return surfaces
+
+    def close(self):
+        # call after dropping the surfaces
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.release()
+
+def add_options(parser):
+    parser.add_option("--prerender-workers", type="int", default=os.cpu_count() or 1, action="store",
+                      dest="prerender_workers", help="number of processes rasterizing the text being loaded in parallel (0 = render in-process)")
+
+    parser.add_option("--prerender-min-batch", type="int", default=16, action="store",
+                      dest="prerender_min_batch", help="min. number of lines to render in one go for the process pool to be used")
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+# getting frames onto the screen.
+#
+# usually only one or two horizontal bands of the screen change per frame.
+# so instead of clearing the whole screen and flipping it, only the rects the
+# effect drew to in the previous frame are cleared, and only those and the
+# ones drawn to in this frame are updated on the display.
+
+import pygame
+
+class Presenter(object):
+
+    def __init__(self, screen, options):
+        self.screen = screen
+        self.options = options
+        self.dirty = None # rects drawn to in the previous frame, None = unknown
+
+    def clear(self, full=False):
+        # prepares the screen for the next frame. full redraws the whole
+        # screen, i.e. when a new scene starts
+        if full or self.dirty is None or not self.options.dirty_rects:
+            self.screen.fill(self.options.bg_color)
+            self.dirty = None
+        else:
+            for rect in self.dirty:
+                self.screen.fill(self.options.bg_color, rect)
+
+    def present(self, rects):
+        # shows the frame. rects are the ones drawn to in this frame (None if unknown)
+        if self.dirty is None or rects is None or not self.options.dirty_rects:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty + rects)
+        self.dirty = rects
+
+def add_options(parser):
+    parser.add_option("--dirty-rects", default=True, action="store_true",
+                      dest="dirty_rects", help="clear and update only the rects drawn to (the default)")
+    parser.add_option("--no-dirty-rects", default=True, action="store_false",
+                      dest="dirty_rects", help="clear and update the whole screen in each frame")
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# what changed between two versions of the text.
+#
+# effects use it to go on showing the same part of the text after a reload,
+# and to keep what they rendered of the parts that did not change.
+
+import bisect, difflib, threading
+
+def pairs(lines):
+    # the (title, score) pairs of a text
+    return [(lines[i], lines[i + 1]) for i in range(0, len(lines) - 1, 2)]
+
+class SequenceChange(object):
+    # maps indexes into an old sequence to indexes into the new one
+
+    def __init__(self, old, new):
+        self.opcodes = difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+        self.starts = [i1 for (tag, i1, i2, j1, j2) in self.opcodes]
+        self.new_length = len(new)
+
+    def map(self, i):
+        # the new index of old item i. replaced or deleted items map to what
+        # took their place. None if the new sequence is empty
+        if self.new_length == 0:
+            return None
+        n = bisect.bisect_right(self.starts, i) - 1
+        if n < 0:
+            return 0
+        (tag, i1, i2, j1, j2) = self.opcodes[n]
+        if j2 > j1:
+            j = j1 + min(i - i1, j2 - j1 - 1)
+        else:
+            j = j1 # deleted: what follows
+        return min(j, self.new_length - 1)
+
+class TextChange(object):
+    # how the text changed from old to new. the diffs are computed when
+    # first asked for, which should happen on the loader thread (in prepare())
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.lock = threading.Lock()
+        self.line_change = None
+        self.pair_change = None
+
+    def lines(self):
+        with self.lock:
+            if self.line_change is None:
+                self.line_change = SequenceChange(list(self.old), list(self.new))
+            return self.line_change
+
+    def pairs(self):
+        with self.lock:
+            if self.pair_change is None:
+                self.pair_change = SequenceChange(pairs(self.old), pairs(self.new))
+            return self.pair_change
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# wall mode: several displays showing one large virtual canvas in lockstep.
+#
+# one process (the coordinator) runs the timeline as usual and sends a tick
+# per frame over UDP: which scene of which effect is shown, where in the text
+# it is and which frame of it to draw. worker processes do not keep time
+# themselves; they draw the frame of the newest tick, each one only its own
+# viewport of the canvas. all of them read the same text file.
+
+import json, os, random, select, socket
+import pygame
+
+def parse_address(address, default_host):
+    # "host:port" or just "port"
+    (host, sep, port) = address.rpartition(":")
+    return (host or default_host, int(port))
+
+class Viewport(object):
+    # the part of the canvas a screen shows, starting at offset. effects
+    # draw onto it in canvas coordinates, the rects returned are the ones
+    # drawn to on the screen
+
+    def __init__(self, surface, offset, size):
+        self.surface = surface
+        self.offset = offset
+        self.size = size
+
+    def get_size(self):
+        return self.size
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        (x, y) = (dest[0] - self.offset[0], dest[1] - self.offset[1])
+        return self.surface.blit(source, (x, y), area, special_flags)
+
+    def fill(self, color, rect=None, special_flags=0):
+        if rect is None:
+            return self.surface.fill(color, None, special_flags)
+        return self.surface.fill(color, pygame.Rect(rect).move(-self.offset[0], -self.offset[1]), special_flags)
+
+class Coordinator(object):
+
+    def __init__(self, addresses):
+        self.addresses = [parse_address(address, "127.0.0.1") for address in addresses.split(",")]
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.session = "%d-%d" % (os.getpid(), random.randint(0, 1 << 30)) # tells workers we restarted
+        self.seq = 0
+
+    def send(self, scene, effect, position, frame):
+        self.seq += 1
+        data = json.dumps({ "session": self.session, "seq": self.seq, "scene": scene,
+                            "effect": effect, "position": position, "frame": frame }).encode("utf-8")
+        for address in self.addresses:
+            try:
+                self.socket.sendto(data, address)
+            except (IOError, OSError):
+                pass # i.e. the worker's host is not up yet
+
+    def close(self):
+        self.socket.close()
+
+class Worker(object):
+
+    def __init__(self, address):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(parse_address(address, "0.0.0.0"))
+        self.socket.setblocking(False)
+        self.session = None
+        self.seq = 0
+
+    def receive(self, timeout):
+        # returns the newest tick that arrived within timeout seconds, or None.
+        # older ticks still queued are skipped, so a slow worker catches up
+        tick = None
+        (readable, _, _) = select.select([self.socket], [], [], timeout)
+        while readable:
+            try:
+                data = self.socket.recv(65536)
+            except (IOError, OSError):
+                break # drained
+            try:
+                t = json.loads(data.decode("utf-8"))
+                newer = t["session"] != self.session or t["seq"] > self.seq
+            except (ValueError, TypeError, KeyError):
+                continue
+            if newer:
+                (self.session, self.seq) = (t["session"], t["seq"])
+                tick = t
+        return tick
+
+    def close(self):
+        self.socket.close()
+
+def add_options(parser):
+    parser.add_option("--canvas", type="string", default=None, action="store",
+                      dest="canvas", help="size of the virtual canvas of a wall in [width]x[height], the screen shows --geometry of it")
+
+    parser.add_option("--viewport", type="string", default="0,0", action="store",
+                      dest="viewport", help="position of the screen on the canvas in [x],[y]")
+
+    parser.add_option("--wall-send", type="string", default=None, action="store",
+                      dest="wall_send", help="coordinate a wall: send ticks to these comma separated [host:]port addresses")
+
+    parser.add_option("--wall-listen", type="string", default=None, action="store",
+                      dest="wall_listen", help="be a wall worker: show the ticks received on this [host:]port")
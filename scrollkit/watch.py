@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+# watching and (re-)loading the text file in the background.
+#
+# the render loop never touches the file system: a worker thread waits for the
+# text file to change, reads and parses it and runs the script's prepare
+# function on it (i.e. to pre-render surfaces). the finished text model is
+# picked up by the render loop with TextLoader.poll() whenever it is ready
+# to switch, i.e. at the next scene boundary. changes pushed to the text
+# (see scrollkit.control) are queued for the worker thread the same way.
+#
+# the text file is read in one go and only an index of where its lines are
+# is built. lines are decoded when an effect asks for them, so huge files
+# cost little more than their bytes and their index.
+
+import array, collections, os, re, select, socket, struct, sys, threading, traceback
+import ctypes, ctypes.util
+
+from scrollkit.control import apply_changes
+
+class TextSource(object):
+    # the non-empty lines of a text file, stripped, as a read-only sequence.
+    # the file is read once and indexed in one pass; line i is decoded on
+    # access. we keep a copy of the file's contents, so a text model stays
+    # what it was when the file is rewritten in place, and showing it never
+    # touches the file.
+
+    line_re = re.compile(br"[^\n]*\S[^\n]*") # non-empty lines (handles windows \r as well)
+
+    def __init__(self, filename, encoding="utf-8"):
+        self.filename = filename
+        self.encoding = encoding
+        self.starts = array.array("q")
+        self.ends = array.array("q")
+        f = open(filename, "rb")
+        try:
+            self.data = f.read()
+        finally:
+            f.close()
+        for match in self.line_re.finditer(self.data):
+            self.starts.append(match.start())
+            self.ends.append(match.end())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.data[self.starts[i]:self.ends[i]].decode(self.encoding, "replace").strip()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def read_text(filename):
+    return TextSource(filename)
+
+def file_signature(filename):
+    # anything that changes when the file gets rewritten, replaced or truncated
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size, stat.st_ino, stat.st_dev)
+
+class Inotify(object):
+    # minimal inotify binding via ctypes. the directory is watched (not the
+    # file) so that files replaced by renaming another file are noticed, too
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+
+    def __init__(self, filename):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC | self.IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(filename))
+        mask = self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE \
+               | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, directory.encode(sys.getfilesystemencoding()), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self.name = os.path.basename(filename)
+
+    def wait(self, timeout):
+        # returns True if the watched file (probably) changed within timeout seconds
+        (readable, _, _) = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except (IOError, OSError):
+            return False
+        pos = 0
+        changed = False
+        while pos + 16 <= len(data):
+            (wd, mask, cookie, length) = struct.unpack_from("iIII", data, pos)
+            name = data[pos + 16:pos + 16 + length].rstrip(b"\0")
+            if name.decode(sys.getfilesystemencoding(), "replace") == self.name:
+                changed = True
+            pos += 16 + length
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class FileWatcher(object):
+    # blocks until the file changed. changes are detected by comparing stat
+    # results at the given interval; inotify (if available) only wakes us up
+    # early. polling stays active, because inotify does not see changes made
+    # by other hosts on network file systems.
+    #
+    # a file rewritten in place is truncated first and written after, so a
+    # change only counts once the file stayed the same for settle seconds.
+
+    def __init__(self, filename, interval=1.0, use_inotify=True, settle=0.1):
+        self.filename = filename
+        self.interval = interval
+        self.settle = settle
+        self.signature = file_signature(filename)
+        self.inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.inotify = Inotify(filename)
+            except (OSError, AttributeError):
+                self.inotify = None
+        self.wakeups = socket.socketpair() # wakeup() writes, wait() selects
+
+    def wakeup(self):
+        # makes wait() return early, from any thread
+        try:
+            self.wakeups[1].send(b"!")
+        except (IOError, OSError):
+            pass # full, wait() is woken up anyway
+
+    def wait(self, stop):
+        # returns True when the file changed, False when woken up or when the stop event was set
+        while not stop.is_set():
+            fds = [self.wakeups[0]]
+            if self.inotify:
+                fds.append(self.inotify.fd)
+            (readable, _, _) = select.select(fds, [], [], self.interval)
+            if self.inotify and self.inotify.fd in readable:
+                self.inotify.wait(0) # read its events
+            woken = self.wakeups[0] in readable
+            if woken:
+                self.wakeups[0].recv(4096)
+            signature = file_signature(self.filename)
+            if signature != self.signature and signature is not None:
+                signature = self.settled(signature, stop)
+                if signature is not None and not stop.is_set():
+                    self.signature = signature
+                    return True
+            if woken:
+                return False
+        return False
+
+    def settled(self, signature, stop):
+        # waits until the file stops changing, returns its signature then
+        while not stop.wait(self.settle):
+            current = file_signature(self.filename)
+            if current == signature:
+                break
+            signature = current
+        return signature
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+        for wakeup in self.wakeups:
+            wakeup.close()
+
+class TextLoader(object):
+    # loads the text file and prepares a text model from it, in the
+    # background after the initial load. prepare(lines) runs on the worker
+    # thread, so it must not share font objects with the render thread.
+
+    def __init__(self, filename, prepare=None, interval=1.0, use_inotify=True):
+        self.filename = filename
+        self.prepare = prepare or (lambda lines: lines)
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.model = None
+        self.thread = None
+        self.text = None # the text the newest model was prepared from
+        self.changes = collections.deque() # batches of pushed changes, for the worker thread
+        self.applying = [] # the batches the worker thread is applying right now
+        self.watcher = None
+
+    def load(self):
+        self.text = read_text(self.filename)
+        return self.prepare(self.text)
+
+    def start(self):
+        # the initial load is done right away (errors are raised to the caller),
+        # later ones happen on the worker thread. returns the first text model
+        self.watcher = FileWatcher(self.filename, self.interval, self.use_inotify)
+        model = self.load()
+        self.thread = threading.Thread(target=self.run, args=(self.watcher,), name="text-loader")
+        self.thread.daemon = True
+        self.thread.start()
+        return model
+
+    def push(self, changes):
+        # queues a batch of changes to the text (see scrollkit.control), from
+        # any thread. raises ValueError if they would leave no title/score pair
+        with self.lock:
+            pending = [change for batch in self.applying + list(self.changes) for change in batch]
+            if len(apply_changes(self.text or [], pending + changes)) < 2:
+                raise ValueError("the changes would leave no scores")
+            self.changes.append(changes)
+        if self.watcher:
+            self.watcher.wakeup()
+
+    def run(self, watcher):
+        changed = False
+        while not self.stop.is_set():
+            try:
+                self.reload(changed)
+            except Exception:
+                # keep the old model and go on watching, the next change
+                # will trigger another attempt
+                sys.stderr.write("cannot reload %s:\n%s" % (self.filename, traceback.format_exc()))
+            changed = watcher.wait(self.stop)
+        watcher.close()
+
+    def reload(self, changed):
+        text = self.text
+        if changed:
+            try:
+                text = read_text(self.filename)
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                # i.e. the file is replaced right now. keep the old model,
+                # the next change will trigger another attempt
+                sys.stderr.write("cannot reload %s: %s\n" % (self.filename, e))
+        with self.lock:
+            self.applying = list(self.changes)
+            self.changes.clear()
+        batches = self.applying
+        try:
+            changes = [change for batch in batches for change in batch]
+            if changes:
+                text = apply_changes(text, changes)
+            if text is not self.text:
+                model = self.prepare(text)
+                with self.lock:
+                    self.text = text
+                    self.model = model
+        except Exception:
+            if batches:
+                # the pushes were accepted, try them again with the next change
+                sys.stderr.write("keeping %d pushed changes for the next attempt\n" % len(batches))
+                with self.lock:
+                    self.changes.extendleft(reversed(batches))
+            raise
+        finally:
+            with self.lock:
+                self.applying = []
+
+    def poll(self):
+        # returns the newest text model if there is one that was not returned before
+        with self.lock:
+            (model, self.model) = (self.model, None)
+        return model
+
+    def close(self, timeout=10.0):
+        # stops the worker thread and waits for it to finish what it is
+        # preparing, so the assets it uses are not torn down under it
+        self.stop.set()
+        if self.watcher:
+            self.watcher.wakeup()
+        if self.thread:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                sys.stderr.write("text loader did not stop within %g seconds\n" % timeout)